@@ -0,0 +1,199 @@
+"""
+Benchmarks the chart functions and dashboard callbacks on synthetic data of several sizes.
+
+Every case runs on datasets 1x, 10x and 100x the size of data/raw/data.csv (see
+synthetic.make_cube) for each filter state: the default 15-day or the full date range,
+with no control point selected, one, or all of them. A case is called --repeat times
+for its latency, the fastest call as the least disturbed by other load on the machine,
+and once more under tracemalloc for its peak memory.
+
+The chart functions are timed on their own, with the `Summary` they take built
+beforehand; building it is timed as a case of its own. The callbacks are posted to
+/_dash-update-component through the Flask test client with the callback cache cleared
+first, so they include the dispatch and JSON serialization of an uncached request, both
+as on a page load (full figures) and as after a filter change (patches).
+
+Results can be saved as a baseline that later runs are compared against. The comparison
+fails, with exit status 1, when a case got slower or needs more memory than its baseline
+by more than --tolerance. Baselines hold absolute times, so record them on the machine
+that runs the comparison.
+
+Run from the project root:
+
+    python -m benchmarks.bench_callbacks --save benchmarks/baseline.json
+    python -m benchmarks.bench_callbacks --compare benchmarks/baseline.json
+    python -m benchmarks.bench_callbacks --scales 1 10 --repeat 3
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.dash_requests import filter_requests
+from benchmarks.synthetic import make_cube
+
+# Differences below these are measurement noise and never count as regressions
+NOISE_SECONDS = 0.002
+NOISE_MIB = 1.0
+
+
+def filter_states(cube):
+    """
+    Lists the filter states of the benchmark matrix.
+
+    Returns:
+        dict: start_date, end_date, control_points and travel_types keyed by a short description.
+    """
+    from src.components import default_date_range
+
+    default = default_date_range(cube.dates[-1].date())
+    date_ranges = {
+        "15 days": (default["start_date"].isoformat(), default["end_date"].isoformat()),
+        "all days": (cube.dates[0].strftime("%Y-%m-%d"), cube.dates[-1].strftime("%Y-%m-%d")),
+    }
+    control_points = {
+        "no cp": None,
+        "1 cp": [cube.members["control_point"][0]],
+        "all cp": list(cube.members["control_point"]),
+    }
+    return {
+        f"{range_name}, {cp_name}": (start_date, end_date, selected, ["Arrival", "Departure"])
+        for range_name, (start_date, end_date) in date_ranges.items()
+        for cp_name, selected in control_points.items()
+    }
+
+
+def function_cases(cube, start_date, end_date, control_points, travel_types):
+    """Returns the chart function calls for one filter state, keyed by case name."""
+    from src.callbacks import compute_totals
+    from src.passenger_count import passenger_count
+    from src.passenger_origin import passenger_origin
+    from src.summary import Summary
+    from src.travel_method import travel_method
+
+    summary = Summary(cube, start_date, end_date, control_points, travel_types)
+    return {
+        "Summary": lambda: Summary(cube, start_date, end_date, control_points, travel_types),
+        "compute_totals": lambda: compute_totals(summary),
+        "travel_method": lambda: travel_method(summary),
+        "passenger_origin": lambda: passenger_origin(summary),
+        "passenger_count": lambda: passenger_count(cube, start_date, end_date, control_points),
+    }
+
+
+def callback_cases(app, client, dependencies, start_date, end_date, control_points, travel_types):
+    """Returns the uncached callback requests for one filter state, keyed by case name."""
+    from src.callbacks import cache
+
+    def post(body):
+        cache.clear()
+        response = client.post("/_dash-update-component", json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{body['output']} failed with status {response.status_code}")
+
+    cases = {}
+    # A page load, then a change of the start date
+    for changed in (None, "date_picker.start_date"):
+        requests = filter_requests(dependencies, start_date, end_date, control_points, travel_types, changed)
+        for output, body in requests.items():
+            name = app.callback_map[output]["callback"].__name__ + ("" if changed is None else " (patch)")
+            cases[name] = lambda body=body: post(body)
+    return cases
+
+
+def measure(call, repeat):
+    """Returns the shortest wall time in seconds and the peak traced memory in MiB of `call`."""
+    # The first call imports modules and fills plotly's lazy caches, so it is not timed
+    call()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    # Tracing slows allocations down, so peak memory comes from a separate call
+    tracemalloc.start()
+    call()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), (peak - current) / 2**20 if peak > current else 0.0
+
+
+def run(scales, repeat):
+    """
+    Runs every case for every scale and filter state.
+
+    Returns:
+        dict: seconds and peak_mib keyed by "<scale>x | <filter state> | <case>".
+    """
+    from src import data_store
+    from src.app import app
+
+    client = app.server.test_client()
+    dependencies = client.get("/_dash-dependencies").get_json()
+
+    results = {}
+    for scale in scales:
+        # The callbacks read the shared cube, so the synthetic one takes its place
+        data_store._cube = None
+        cube = make_cube(scale)
+        data_store._cube = cube
+        print(f"{scale}x: {len(cube.members['control_point'])} control points, {len(cube.dates)} days")
+
+        for state, filters in filter_states(cube).items():
+            cases = function_cases(cube, *filters)
+            cases.update(callback_cases(app, client, dependencies, *filters))
+            for case, call in cases.items():
+                seconds, peak_mib = measure(call, repeat)
+                results[f"{scale}x | {state} | {case}"] = {"seconds": seconds, "peak_mib": peak_mib}
+                print(f"  {state:<16} {case:<32} {seconds * 1000:9.2f} ms  peak {peak_mib:8.2f} MiB")
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Compares results with a baseline.
+
+    Returns:
+        list of str: One line per measurement more than `tolerance` (a fraction) above its baseline.
+    """
+    lines = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric, noise in (("seconds", NOISE_SECONDS), ("peak_mib", NOISE_MIB)):
+            value, reference = result[metric], baseline[key][metric]
+            if value > reference * (1 + tolerance) and value - reference > noise:
+                lines.append(f"{key}: {metric} {value:.4f} vs baseline {reference:.4f}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="dataset sizes, as multiples of data/raw/data.csv")
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per case, the fastest is reported")
+    parser.add_argument("--save", help="write the results as a baseline to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed increase over the baseline, as a fraction")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines = regressions(results, baseline, args.tolerance)
+        for line in lines:
+            print("Regression:", line)
+        print(f"{len(lines)} regressions over {len(results)} measurements")
+        if lines:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
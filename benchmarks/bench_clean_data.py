@@ -0,0 +1,97 @@
+"""
+Compares the in-memory and the streaming clean_data paths on a synthetic multi-year raw file.
+
+Run from the project root:
+
+    python -m benchmarks.bench_clean_data --years 20
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import write_raw_data
+from src.clean_data import clean_data, read_processed
+
+
+def clean_data_in_memory(raw_path, output_path):
+    """Previous clean_data: melts the whole raw file at once and classifies row by row."""
+    df = pd.read_csv(raw_path)
+    df = df.iloc[:, 1:7]
+    df = df.melt(
+        id_vars=df.columns[:3],
+        var_name="passenger_origin",
+        value_name="passenger_count"
+        )
+    df = df.rename(
+        columns={
+            "Date": "date",
+            "Control Point": "control_point",
+            "Arrival / Departure": "travel_type",
+        }
+    )
+    df['travel_method'] = df['control_point'].apply(lambda x:
+        'by air' if 'Airport' in x else
+        'by sea' if any(key_word in x for key_word in ['Terminal', 'Harbour']) else
+        'by land'
+    )
+    df.to_csv(output_path)
+    return len(df)
+
+
+def measure(function, *args):
+    """Returns wall time in seconds and peak traced memory in MiB, from separate calls."""
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows allocations down, so peak memory comes from a second run
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def same_output(csv_path, feather_path):
+    """Checks that the in-memory CSV and the streamed Feather output hold the same rows, ignoring row order."""
+    columns = ["date", "control_point", "travel_type", "passenger_origin", "passenger_count", "travel_method"]
+    a = pd.read_csv(csv_path, usecols=columns)[columns]
+    a["date"] = pd.to_datetime(a["date"], format="%d-%m-%Y")
+    b = read_processed(feather_path)[columns].astype({column: str for column in columns[1:4] + columns[5:]})
+    b["passenger_count"] = b["passenger_count"].astype(a["passenger_count"].dtype)
+    a = a.sort_values(columns).reset_index(drop=True)
+    b = b.sort_values(columns).reset_index(drop=True)
+    return a.equals(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=20, help="years of synthetic daily history")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="raw rows per streaming chunk")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, "raw.csv")
+        rows = write_raw_data(raw_path, years=args.years)
+        print(f"Synthetic raw file: {rows:,} rows ({args.years} years)")
+
+        old_path = os.path.join(tmp, "old.csv")
+        new_path = os.path.join(tmp, "new.feather")
+        results = {
+            "in-memory": measure(clean_data_in_memory, raw_path, old_path),
+            # The cube is skipped, as the in-memory path never built one
+            "streaming": measure(clean_data, raw_path, new_path, args.chunksize,
+                                 os.path.join(tmp, "manifest.json"), None),
+        }
+
+        for name, (elapsed, peak) in results.items():
+            print(f"{name:>10}: {elapsed:7.2f} s, peak {peak:8.1f} MiB")
+        print("Outputs match:", same_output(old_path, new_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Times the dashboard's cold start.
+
+For each startup mode a fresh gunicorn server is started and the benchmark records
+how long it takes until the server answers its first page load and its first
+callback. Importing src.app on its own is timed in a fresh interpreter as well.
+
+Run from the project root:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pandas as pd
+
+from benchmarks.dash_requests import fetch_json, filter_requests
+from src.clean_data import read_manifest
+
+
+def time_import(runs):
+    """Returns the median time to import src.app in a fresh interpreter, in seconds."""
+    code = "import time; t = time.perf_counter(); import src.app; print(time.perf_counter() - t)"
+    times = [
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+        for _ in range(runs)
+    ]
+    return statistics.median(times)
+
+
+def callback_request(port):
+    """Builds the request for the totals, map and charts over the default date range."""
+    url = f"http://127.0.0.1:{port}"
+    end_date = pd.Timestamp(read_manifest()["last_date"])
+    start_date = end_date - pd.Timedelta(days=15)
+    requests = filter_requests(
+        fetch_json(url, "_dash-dependencies"), start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"),
+        None, ["Arrival", "Departure"],
+    )
+    # The callback with several outputs is the one updating the totals, map and charts
+    body = next(body for output, body in requests.items() if output.startswith(".."))
+    return urllib.request.Request(
+        f"{url}/_dash-update-component", data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+    )
+
+
+def time_server_start(mode, port, timeout=60):
+    """
+    Starts a one-worker gunicorn server and times its first responses.
+
+    Returns:
+        tuple: Seconds from launch until the first page layout and until the first callback response.
+    """
+    env = dict(os.environ, STARTUP_MODE=mode)
+    command = [sys.executable, "-m", "gunicorn", "src.app:server", "--workers", "1", "--bind", f"127.0.0.1:{port}"]
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/_dash-layout").read()
+                break
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f"Server did not start within {timeout} s")
+                time.sleep(0.01)
+        first_layout = time.perf_counter() - start
+        urllib.request.urlopen(callback_request(port)).read()
+        first_callback = time.perf_counter() - start
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return first_layout, first_callback
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="repetitions per measurement, the median is reported")
+    parser.add_argument("--port", type=int, default=8050, help="port to bind the server to")
+    parser.add_argument("--modes", nargs="+", default=["lazy", "eager"], help="STARTUP_MODE values to compare")
+    args = parser.parse_args()
+
+    print(f"import src.app: {time_import(args.runs):.3f} s")
+    for mode in args.modes:
+        results = [time_server_start(mode, args.port) for _ in range(args.runs)]
+        layout = statistics.median(result[0] for result in results)
+        callback = statistics.median(result[1] for result in results)
+        print(f"STARTUP_MODE={mode:<5}: first layout {layout:.3f} s, first callback {callback:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Builds the requests the dashboard page sends to /_dash-update-component.
+
+The request bodies are derived from the app's /_dash-dependencies, so they keep
+matching the registered callbacks when their outputs change.
+"""
+import json
+import urllib.request
+
+# Filter components and properties, in the order of the values passed to `filter_requests`
+FILTERS = (
+    ("date_picker", "start_date"),
+    ("date_picker", "end_date"),
+    ("control_point_dropdown", "value"),
+    ("arrival_departure", "value"),
+)
+
+
+def filter_callbacks(dependencies):
+    """Returns the server-side callbacks whose inputs are all filters, as listed by /_dash-dependencies."""
+    return [
+        dependency for dependency in dependencies
+        if dependency.get("clientside_function") is None
+        and dependency["inputs"]
+        and all((i["id"], i["property"]) in FILTERS for i in dependency["inputs"])
+    ]
+
+
+def request_body(dependency, values, changed=None):
+    """
+    Builds the JSON body of one callback request.
+
+    Parameters:
+        dependency (dict): The callback as listed by /_dash-dependencies.
+        values (dict): Input values keyed by (component id, property).
+        changed (str, optional): The input whose change triggered the callback, e.g.
+            "date_picker.start_date", which makes the callbacks patch their figures.
+            None for the call made when the page loads, which builds them.
+
+    Returns:
+        dict: The request body.
+    """
+    outputs = [
+        dict(zip(("id", "property"), output.rsplit(".", 1)))
+        for output in dependency["output"].strip(".").split("...")
+    ]
+    inputs = [dict(i, value=values[i["id"], i["property"]]) for i in dependency["inputs"]]
+    return {
+        "output": dependency["output"],
+        "outputs": outputs if dependency["output"].startswith("..") else outputs[0],
+        "inputs": inputs,
+        "changedPropIds": [] if changed is None else [changed],
+        "state": [{"id": s["id"], "property": s["property"]} for s in dependency.get("state", [])],
+    }
+
+
+def filter_requests(dependencies, start_date, end_date, control_points, travel_types, changed=None):
+    """
+    Builds the requests a page sends for one filter state, one per callback the change triggers.
+
+    Parameters:
+        dependencies (list): The callbacks as listed by /_dash-dependencies.
+        start_date (str): The start date selected in the date picker.
+        end_date (str): The end date selected in the date picker.
+        control_points (list or None): Selected control points.
+        travel_types (list): Selected travel types (arrival/departure).
+        changed (str, optional): The filter that changed, e.g. "arrival_departure.value";
+            None for a page load, which calls every callback reading the filters.
+
+    Returns:
+        dict: Request bodies keyed by the callbacks' output strings, e.g. "passenger_count.figure".
+    """
+    values = dict(zip(FILTERS, (start_date, end_date, control_points, travel_types)))
+    return {
+        dependency["output"]: request_body(dependency, values, changed)
+        for dependency in filter_callbacks(dependencies)
+        if changed is None or changed in (f"{i['id']}.{i['property']}" for i in dependency["inputs"])
+    }
+
+
+def output_ids(output):
+    """Returns the component ids of a callback's output string, e.g. "passenger_count" for "passenger_count.figure"."""
+    return ",".join(item.rsplit(".", 1)[0] for item in output.strip(".").split("..."))
+
+
+def fetch_json(url, path):
+    """Returns the JSON a running server answers at `path`, e.g. for url http://127.0.0.1:8050."""
+    with urllib.request.urlopen(f"{url}/{path}") as response:
+        return json.load(response)
@@ -0,0 +1,247 @@
+"""
+Drives the dashboard's callback endpoint with concurrent simulated visitors.
+
+Each visitor replays random filter sessions the way the page sends them: it loads the
+layout and the initial callbacks, then widens the date range a few days or weeks at a
+time, adds control points to the dropdown selection (clearing it once it gets long) and
+toggles the arrival/departure checkboxes. Every change is posted to
+/_dash-update-component for each callback it triggers, as the browser would, with no
+pause in between unless --think is set. Sessions are seeded, so runs are repeatable.
+
+By default a gunicorn server is started with the given --workers and --threads and
+any --env settings, e.g. STARTUP_MODE=eager or CACHE_REDIS_URL=redis://localhost:6379/0,
+so settings can be compared under the same load. --url targets a running server instead.
+
+The report lists the throughput and, per output ids of each callback, the number of
+requests, their p50/p95/p99 latency and the share answered with an error or not at all.
+
+Run from the project root:
+
+    python -m benchmarks.load_test --users 20 --duration 60 --workers 4
+    python -m benchmarks.load_test --users 20 --workers 2 --threads 4 --env CACHE_MAX_BYTES=0
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --users 50
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dash_requests import filter_requests, output_ids
+
+# Requests of a page load besides the callbacks, labelled by their paths in the report
+LAYOUT = "_dash-layout"
+DEPENDENCIES = "_dash-dependencies"
+
+
+@contextlib.contextmanager
+def serve(port, workers, threads, env, timeout=60):
+    """
+    Runs a gunicorn server for the dashboard until the block exits.
+
+    Yields:
+        str: The URL of the server once it answers.
+    """
+    command = [
+        sys.executable, "-m", "gunicorn", "src.app:server",
+        "--workers", str(workers), "--threads", str(threads), "--bind", f"127.0.0.1:{port}",
+    ]
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(command, env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/{LAYOUT}").read()
+                break
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f"Server did not start within {timeout} s")
+                time.sleep(0.05)
+        yield url
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+
+def find_props(node, component_id):
+    """Returns the props of the component with id `component_id` in a layout from /_dash-layout, or None."""
+    if isinstance(node, list):
+        for child in node:
+            props = find_props(child, component_id)
+            if props is not None:
+                return props
+    elif isinstance(node, dict):
+        props = node.get("props", {})
+        if props.get("id") == component_id:
+            return props
+        for value in props.values():
+            found = find_props(value, component_id)
+            if found is not None:
+                return found
+    return None
+
+
+def session(rng, layout, steps):
+    """
+    Generates the filter changes of one visit.
+
+    Parameters:
+        rng (random.Random): Source of the visitor's choices.
+        layout (dict): The page layout, which holds the initial filters and the control points.
+        steps (int): Number of interactions after the page load.
+
+    Yields:
+        tuple: The changed filter, None for the page load, and the start_date, end_date,
+            control_points and travel_types sent with it.
+    """
+    date_picker = find_props(layout, "date_picker")
+    options = find_props(layout, "control_point_dropdown")["options"]
+    control_point_options = [option["value"] if isinstance(option, dict) else option for option in options]
+
+    start_date = pd.Timestamp(date_picker["start_date"])
+    end_date = date_picker["end_date"]
+    control_points = None
+    travel_types = find_props(layout, "arrival_departure")["value"]
+    yield None, (start_date.strftime("%Y-%m-%d"), end_date, control_points, travel_types)
+
+    for _ in range(steps):
+        action = rng.choice(("dates", "control_points", "travel_types"))
+        if action == "dates":
+            # Moving the start date back step by step, each pick a request of its own
+            step = pd.Timedelta(days=rng.choice((1, 7, 30)))
+            for _ in range(rng.randint(1, 5)):
+                start_date -= step
+                yield "date_picker.start_date", (start_date.strftime("%Y-%m-%d"), end_date, control_points, travel_types)
+        elif action == "control_points":
+            if control_points and len(control_points) >= 4:
+                control_points = None
+            else:
+                control_points = (control_points or []) + [rng.choice(control_point_options)]
+            yield "control_point_dropdown.value", (start_date.strftime("%Y-%m-%d"), end_date, control_points, travel_types)
+        else:
+            travel_types = rng.choice((["Arrival"], ["Departure"], ["Arrival", "Departure"]))
+            yield "arrival_departure.value", (start_date.strftime("%Y-%m-%d"), end_date, control_points, travel_types)
+
+
+class Recorder:
+    """Latencies and failures of the requests sent, per label, shared by the visitor threads."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def request(self, label, url, body=None):
+        """Sends a request and records how long it took, or that it failed; returns the decoded response or None."""
+        data = None if body is None else json.dumps(body).encode()
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                content = response.read()
+        except (urllib.error.URLError, OSError):
+            with self._lock:
+                self.errors[label] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[label].append(elapsed)
+        return json.loads(content) if content else None
+
+    def report(self, elapsed):
+        """
+        Returns:
+            dict: requests, throughput, and count, p50/p95/p99 latency in ms and error rate per label.
+        """
+        labels = sorted(set(self.latencies) | set(self.errors))
+        total = sum(len(self.latencies[label]) + self.errors[label] for label in labels)
+        outputs = {}
+        for label in labels:
+            latencies = np.array(self.latencies[label]) * 1000
+            count = len(latencies) + self.errors[label]
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+            outputs[label] = {
+                "requests": count, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                "error_rate": self.errors[label] / count,
+            }
+        return {"requests": total, "seconds": elapsed, "throughput": total / elapsed, "outputs": outputs}
+
+
+def visitor(url, recorder, seed, deadline, steps, think):
+    """Replays sessions of one visitor until `deadline`."""
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        # A page load fetches the layout and the callbacks before calling them
+        layout = recorder.request(LAYOUT, f"{url}/{LAYOUT}")
+        dependencies = recorder.request(DEPENDENCIES, f"{url}/{DEPENDENCIES}")
+        if layout is None or dependencies is None:
+            continue
+        for changed, filters in session(rng, layout, steps):
+            for output, body in filter_requests(dependencies, *filters, changed).items():
+                recorder.request(output_ids(output), f"{url}/_dash-update-component", body)
+            if time.perf_counter() >= deadline:
+                return
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+
+
+def run(url, users, duration, steps, think, seed):
+    """Runs `users` concurrent visitors against `url` for `duration` seconds and returns the report."""
+    recorder = Recorder()
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=visitor, args=(url, recorder, seed + i, start + duration, steps, think), daemon=True)
+        for i in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent visitors")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep sending requests")
+    parser.add_argument("--steps", type=int, default=10, help="filter changes per session after the page load")
+    parser.add_argument("--think", type=float, default=0, help="mean pause between filter changes, in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first visitor's sessions")
+    parser.add_argument("--url", help="URL of a running server; otherwise one is started")
+    parser.add_argument("--port", type=int, default=8050, help="port of the started server")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers of the started server")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker of the started server")
+    parser.add_argument("--env", nargs="*", default=[], metavar="NAME=VALUE",
+                        help="environment of the started server, e.g. CACHE_MAX_BYTES=0")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        url = args.url or stack.enter_context(
+            serve(args.port, args.workers, args.threads, dict(setting.split("=", 1) for setting in args.env))
+        )
+        report = run(url, args.users, args.duration, args.steps, args.think, args.seed)
+
+    print(f"{report['requests']:,} requests in {report['seconds']:.1f} s: {report['throughput']:.1f} requests/s")
+    for label, stats in report["outputs"].items():
+        print(f"{label}\n    {stats['requests']:>7,} requests, p50 {stats['p50_ms']:8.1f} ms, "
+              f"p95 {stats['p95_ms']:8.1f} ms, p99 {stats['p99_ms']:8.1f} ms, errors {stats['error_rate']:.1%}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from src.clean_data import classify_travel_method, clean_chunk
+from src.data_cube import DataCube
+
+# Control points from get_lat_long.py
+CONTROL_POINTS = [
+    "Airport", "Express Rail Link West Kowloon", "Hung Hom", "Lo Wu",
+    "Lok Ma Chau Spur Line", "Heung Yuen Wai", "Hong Kong-Zhuhai-Macao Bridge", "Lok Ma Chau",
+    "Man Kam To", "Sha Tau Kok", "Shenzhen Bay", "China Ferry Terminal", "Harbour Control",
+    "Kai Tak Cruise Terminal", "Macau Ferry Terminal", "Tuen Mun Ferry Terminal"
+]
+ORIGINS = ["Hong Kong Residents", "Mainland Visitors", "Other Visitors"]
+
+
+def make_raw_data(years=4, start_date="2021-01-01", control_points=CONTROL_POINTS, seed=0):
+    """
+    Generates a synthetic raw dataset in the layout written by load_data.py.
+
+    Parameters:
+        years (int): Number of years of daily history to generate.
+        start_date (str): First day of the history.
+        control_points (list of str): Control points reported every day.
+        seed (int): Seed for the random passenger counts.
+
+    Returns:
+        pd.DataFrame: One row per date, control point and travel type, with counts per passenger origin.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=int(365.25 * years), freq="D")
+    n = len(dates) * len(control_points) * 2
+
+    df = pd.DataFrame({
+        "Date": np.repeat(dates.strftime("%d-%m-%Y"), len(control_points) * 2),
+        "Control Point": np.tile(np.repeat(control_points, 2), len(dates)),
+        "Arrival / Departure": np.tile(["Arrival", "Departure"], len(dates) * len(control_points)),
+    })
+    for origin in ORIGINS:
+        df[origin] = rng.integers(0, 20_000, n)
+    df["Total"] = df[ORIGINS].sum(axis=1)
+    df["Unnamed: 7"] = np.nan
+    return df
+
+
+def write_raw_data(path, **kwargs):
+    """
+    Writes a synthetic raw dataset to `path` exactly as load_data.py writes the real one.
+
+    Takes the same keyword arguments as `make_raw_data` and returns the number of rows written.
+    """
+    df = make_raw_data(**kwargs)
+    df.to_csv(path)
+    return len(df)
+
+
+def make_cube(scale=1, years=4, start_date="2021-01-01", seed=0):
+    """
+    Builds the daily cube of a synthetic dataset `scale` times the size of `years` of raw history.
+
+    The dataset grows by adding control points: each real one is repeated `scale` times under
+    numbered names, e.g. "Airport 2", keeping its travel method. The date axis stays as long
+    as the history, as a dashboard range covers real days, and 100 times the days of the
+    current data would run past the dates pandas can represent.
+
+    Parameters:
+        scale (int): Number of copies of the control points.
+        years (int): Number of years of daily history; 4 years is about the size of data/raw/data.csv.
+        start_date (str): First day of the history.
+        seed (int): Seed for the random passenger counts, incremented per copy.
+
+    Returns:
+        DataCube: Daily passenger counts aggregated one copy of the control points at a time.
+    """
+    copies = [
+        [cp if copy == 0 else f"{cp} {copy + 1}" for cp in CONTROL_POINTS]
+        for copy in range(scale)
+    ]
+    dates = pd.date_range(start_date, periods=int(365.25 * years), freq="D")
+    members = {
+        "control_point": pd.Index([cp for control_points in copies for cp in control_points]),
+        "travel_type": pd.Index(["Arrival", "Departure"]),
+        "passenger_origin": pd.Index(ORIGINS),
+    }
+    travel_methods = np.array([classify_travel_method(cp) for cp in members["control_point"]], dtype=object)
+
+    def chunks():
+        for copy, control_points in enumerate(copies):
+            raw = make_raw_data(years, start_date, control_points, seed + copy)
+            df = clean_chunk(raw.iloc[:, :6])
+            df["date"] = pd.to_datetime(df["date"], format="%d-%m-%Y")
+            yield df
+
+    return DataCube.from_chunks(chunks(), dates, members, travel_methods)
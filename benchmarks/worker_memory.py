@@ -0,0 +1,131 @@
+"""
+Measures the memory of each gunicorn worker serving the dashboard.
+
+RSS counts pages shared between processes once per process, so it overstates
+what a worker really costs. PSS splits every shared page evenly between the
+processes mapping it, and the sum of PSS over the master and its workers is the
+memory the whole pool occupies. Compare that total before and after a change,
+or across --workers values, to size containers.
+
+Run from the project root (Linux only, reads /proc):
+
+    python -m benchmarks.worker_memory --workers 4
+    python -m benchmarks.worker_memory --pid 12345   # an already running master
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pandas as pd
+
+from src.clean_data import read_manifest
+
+# smaps_rollup fields reported per process, in kB
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid):
+    """Returns the smaps_rollup fields of a process in MiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return values
+
+
+def child_pids(pid):
+    """Returns the direct children of a process."""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children += [int(child) for child in f.read().split()]
+    return children
+
+
+def warm_up(port, requests):
+    """Sends page loads and callback requests so every worker has loaded the app and its data."""
+    base = f"http://127.0.0.1:{port}"
+    end_date = pd.Timestamp(read_manifest()["last_date"])
+    start_date = end_date - pd.Timedelta(days=15)
+    body = json.dumps({
+        "output": "passenger_count.figure",
+        "outputs": {"id": "passenger_count", "property": "figure"},
+        "inputs": [
+            {"id": "date_picker", "property": "start_date", "value": start_date.strftime("%Y-%m-%d")},
+            {"id": "date_picker", "property": "end_date", "value": end_date.strftime("%Y-%m-%d")},
+            {"id": "control_point_dropdown", "property": "value", "value": None},
+        ],
+        "changedPropIds": [],
+    }).encode()
+    for _ in range(requests):
+        urllib.request.urlopen(f"{base}/_dash-layout").read()
+        request = urllib.request.Request(
+            f"{base}/_dash-update-component", data=body, headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(request).read()
+
+
+def wait_for_server(port, timeout):
+    """Polls the server until it answers or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_dash-layout").read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"Server on port {port} did not start within {timeout} s")
+
+
+def report(master):
+    """Prints the memory of the master and its workers and the pool totals."""
+    pids = [master] + child_pids(master)
+    rows = [(pid, read_memory(pid)) for pid in pids]
+
+    print(f"{'process':>16} " + " ".join(f"{field:>14}" for field in FIELDS))
+    for pid, values in rows:
+        role = "master" if pid == master else "worker"
+        print(f"{role + ' ' + str(pid):>16} " + " ".join(f"{values[field]:>10.1f} MiB" for field in FIELDS))
+    totals = {field: sum(values[field] for _, values in rows) for field in FIELDS}
+    print(f"{'total':>16} " + " ".join(f"{totals[field]:>10.1f} MiB" for field in FIELDS))
+    print(f"\nPool memory (sum of PSS) with {len(pids) - 1} workers: {totals['Pss']:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="number of gunicorn workers to start")
+    parser.add_argument("--port", type=int, default=8050, help="port to bind the server to")
+    parser.add_argument("--no-preload", action="store_true", help="import the app in every worker instead of once")
+    parser.add_argument("--pid", type=int, help="measure a running gunicorn master instead of starting one")
+    args = parser.parse_args()
+
+    if args.pid:
+        report(args.pid)
+        return
+
+    command = [
+        sys.executable, "-m", "gunicorn", "src.app:server",
+        "--workers", str(args.workers), "--bind", f"127.0.0.1:{args.port}",
+    ]
+    if args.no_preload:
+        # An empty config file replaces gunicorn.conf.py and its preload_app setting
+        command += ["--config", os.devnull]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(args.port, timeout=60)
+        warm_up(args.port, requests=4 * args.workers)
+        report(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
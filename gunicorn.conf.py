@@ -0,0 +1,36 @@
+import os
+
+# Gunicorn settings, picked up automatically when serving from the project root:
+#
+#     gunicorn src.app:server
+#
+# Import the app once in the master process so workers are forked with its code
+# already loaded and share those pages instead of each importing its own copy.
+preload_app = True
+
+# STARTUP_MODE controls when the data and the chart modules are loaded:
+#   lazy  (default) each worker imports the chart modules, starts serving and loads
+#         the data in a background thread, so cold starts are fast; the first
+#         requests may wait for the data.
+#   eager the master loads them after binding and before forking, so every worker
+#         shares one copy; workers only start once loading has finished.
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "lazy")
+
+# REFRESH_INTERVAL=<seconds> makes every worker check for new data in a background
+# thread and swap it in without a restart, see src/refresher.py.
+
+
+def when_ready(server):
+    if STARTUP_MODE == "eager":
+        from src.callbacks import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    if STARTUP_MODE == "lazy":
+        from src.app import start_warm_up
+        start_warm_up()
+
+    # Threads do not survive the fork, so each worker starts its own
+    from src.refresher import start_refresh
+    start_refresh()
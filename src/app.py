@@ -1,8 +1,10 @@
+import threading
 from dash import Dash  # type: ignore
 import dash_bootstrap_components as dbc  # type: ignore
-import dash_vega_components as dvc # type: ignore
-from src.callbacks import register_callbacks  # Import the callback registration function
-from src.components import layout
+from src.callbacks import cache, import_modules, register_callbacks, warm_cache  # Import the callback registration function
+from src.components import layout, validation_layout
+from src.metrics import metrics
+from src.refresher import start_refresh
 
 # Initialize the Dash app with Bootstrap for styling
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
@@ -11,12 +13,31 @@ server = app.server  # for deployment
 # Set tab title
 app.title = "Hong Kong Passenger Traffic Tracker"
 
-# Layout setup
+# Layout setup: built on each page load, so the data is not read at import
+app.validation_layout = validation_layout
 app.layout = layout
 
 # Register callbacks
 register_callbacks(app)
 
+# Time the callback requests and serve the metrics at /metrics, see src/metrics.py
+metrics.init_app(app, cache)
+
+
+def start_warm_up():
+    """
+    Imports the chart modules, then loads the data and warms the cache in a background thread
+    while the server starts taking requests.
+
+    The imports finish before this returns: a request served while another thread is
+    still importing a module can find it partially initialized and fail.
+    """
+    import_modules()
+    threading.Thread(target=warm_cache, name="warm-up", daemon=True).start()
+
+
 # Run the app
 if __name__ == "__main__":
+    start_warm_up()
+    start_refresh()
     app.run_server(debug=False, port=8080)
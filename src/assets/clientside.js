@@ -0,0 +1,94 @@
+// Clientside versions of the totals and bar charts, registered with AGGREGATION_MODE=client.
+// They read the daily data packed by callbacks.client_data() from the "aggregates" store,
+// so changing a filter recomputes them in the browser without a round trip.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    aggregation: {
+        update_summary: function (start_date, end_date, control_points, travel_types, data) {
+            if (!data) {
+                return Array(4).fill(window.dash_clientside.no_update);
+            }
+            const members = data.members;
+
+            // Date range as positions on the date axis; a missing bound means the full range
+            const dayMs = 24 * 60 * 60 * 1000;
+            const firstDay = Date.parse(data.start_date + "T00:00:00Z");
+            const dayIndex = (date) => Math.round((Date.parse(date.slice(0, 10) + "T00:00:00Z") - firstDay) / dayMs);
+            const start = start_date ? Math.max(0, dayIndex(start_date)) : 0;
+            const stop = end_date ? Math.min(data.days, dayIndex(end_date) + 1) : data.days;
+
+            // Selected members as positions along their axis, all when nothing is selected
+            const select = (axis, selected) => members[axis]
+                .map((member, i) => i)
+                .filter((i) => !selected || selected.length === 0 || selected.includes(members[axis][i]));
+            const controlPoints = select("control_point", control_points);
+            const travelTypes = select("travel_type", travel_types);
+            const nControlPoints = members.control_point.length;
+            const nTravelTypes = members.travel_type.length;
+            const nOrigins = members.passenger_origin.length;
+
+            let total = 0;
+            let rows = 0;
+            let touristRows = 0;
+            const methodCounts = {};
+            const originCounts = new Array(nOrigins).fill(0);
+            const originRows = new Array(nOrigins).fill(0);
+            for (const cp of controlPoints) {
+                let cpCount = 0;
+                let cpRows = 0;
+                for (let d = start; d < stop; d++) {
+                    for (const tt of travelTypes) {
+                        const offset = ((d * nControlPoints + cp) * nTravelTypes + tt) * nOrigins;
+                        for (let o = 0; o < nOrigins; o++) {
+                            const value = data.counts[offset + o];
+                            if (value === null) {
+                                continue;
+                            }
+                            cpCount += value;
+                            cpRows += 1;
+                            originCounts[o] += value;
+                            originRows[o] += 1;
+                            // Entries are arrival records of visitors, i.e. every origin except Hong Kong residents
+                            if (members.travel_type[tt] === "Arrival" &&
+                                members.passenger_origin[o] !== "Hong Kong Residents") {
+                                touristRows += 1;
+                            }
+                        }
+                    }
+                }
+                total += cpCount;
+                rows += cpRows;
+                if (cpRows > 0) {
+                    const method = data.travel_methods[cp];
+                    methodCounts[method] = (methodCounts[method] || 0) + cpCount;
+                }
+            }
+
+            let totals = ["0", "0"];
+            if (start_date && end_date && rows > 0) {
+                const volumeEntries = Math.round(touristRows / 7.54e6 * 100000 * 100) / 100;
+                totals = [total.toLocaleString("en-US"), volumeEntries.toFixed(2)];
+            }
+
+            // Same figures as the server builds, with the bars of the selected filters swapped in
+            const withBars = (figure, counts, labels) => {
+                const updated = JSON.parse(JSON.stringify(figure));
+                updated.data[0].x = counts;
+                updated.data[0].y = labels;
+                return updated;
+            };
+            const methods = Object.keys(methodCounts).sort();
+            const origins = members.passenger_origin.map((origin, o) => o).filter((o) => originRows[o] > 0);
+
+            return [
+                totals[0],
+                totals[1],
+                withBars(data.figures.travel_method, methods.map((m) => methodCounts[m]), methods),
+                withBars(
+                    data.figures.passenger_origin,
+                    origins.map((o) => originCounts[o]),
+                    origins.map((o) => members.passenger_origin[o])
+                ),
+            ];
+        },
+    },
+});
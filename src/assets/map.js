@@ -0,0 +1,11 @@
+// Draws each control point of the "control_point_markers" GeoJSON layer as a circle marker
+// sized by the radius computed in callbacks.control_point_markers().
+window.map_markers = Object.assign({}, window.map_markers, {
+    point_to_layer: function (feature, latlng) {
+        return L.circleMarker(latlng, {
+            radius: feature.properties.radius,
+            fill: true,
+            fillOpacity: 0.6,
+        });
+    },
+});
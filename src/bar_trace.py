@@ -0,0 +1,45 @@
+def bar_trace(df, x, y, labels, orientation="h", hover_data=(), marker=None):
+    """
+    The bar trace of a bar chart, laid out as `plotly.express.bar` draws it.
+
+    The full figures and their patches share it, so both draw the same bars. Like
+    plotly.express, no trace at all is drawn without data, and a figure built for a
+    selection without data has no trace to update: patches therefore replace the
+    figure's `data` as a whole with the returned list.
+
+    Parameters:
+        df (pd.DataFrame): One row per bar.
+        x (str): Column of `df` along the x axis.
+        y (str): Column of `df` along the y axis.
+        labels (dict): Display names of the columns, used in the hover text.
+        orientation (str): "h" for horizontal bars, "v" for vertical ones.
+        hover_data (list of str): Further columns shown in the hover text.
+        marker (dict, optional): Marker properties, e.g. the bar color.
+
+    Returns:
+        list of dict: The bar trace, or no trace when `df` is empty.
+    """
+    if df.empty:
+        return []
+
+    hover = [f"{labels[x]}=%{{x}}", f"{labels[y]}=%{{y}}"]
+    hover += [f"{labels.get(column, column)}=%{{customdata[{i}]}}" for i, column in enumerate(hover_data)]
+    trace = {
+        "type": "bar",
+        "orientation": orientation,
+        "x": df[x],
+        "y": df[y],
+        "marker": {**(marker or {}), "pattern": {"shape": ""}},
+        "hovertemplate": "<br>".join(hover) + "<extra></extra>",
+        "name": "",
+        "legendgroup": "",
+        "showlegend": False,
+        "alignmentgroup": "True",
+        "offsetgroup": "",
+        "textposition": "auto",
+        "xaxis": "x",
+        "yaxis": "y",
+    }
+    if hover_data:
+        trace["customdata"] = df[list(hover_data)].to_numpy()
+    return [trace]
@@ -0,0 +1,215 @@
+import functools
+import json
+import os
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+# Upper bound on the pickled size of the entries kept by the in-memory cache
+MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Set to e.g. redis://localhost:6379/0 to share cached results between worker processes
+REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+
+
+def normalize(value):
+    """
+    Canonical form of a callback argument for use in a cache key.
+
+    Lists are treated as sets of selected members, so `["A", "B"]` and `["B", "A"]`
+    give the same key, and ISO date strings are reduced to their date when they carry
+    a midnight time, so `"2025-02-26"` and `"2025-02-26T00:00:00"` do too.
+
+    Parameters:
+        value: A callback argument, e.g. a date picker or dropdown value.
+
+    Returns:
+        The normalized value, JSON serializable if `value` was.
+    """
+    if isinstance(value, (list, tuple)):
+        items = {json.dumps(item): item for item in map(normalize, value)}
+        return [items[encoded] for encoded in sorted(items)]
+    if isinstance(value, str):
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if timestamp.time() == datetime.min.time() and timestamp.tzinfo is None:
+            return timestamp.date().isoformat()
+        return timestamp.isoformat()
+    return value
+
+
+def make_key(name, args, version=None):
+    """
+    Builds the cache key of a call to the function `name` with positional `args` on data `version`.
+    """
+    return json.dumps([name, version] + [normalize(arg) for arg in args])
+
+
+class CallbackCache(ABC):
+    """
+    Base class of the callback result caches, counting hits and misses per cached function.
+
+    Subclasses implement `get`, `set` and `clear`; `get` returns `MISSING` for keys it does not hold.
+    """
+
+    MISSING = object()
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+
+    @abstractmethod
+    def get(self, key):
+        """Returns the value stored under `key`, or `MISSING`."""
+
+    @abstractmethod
+    def set(self, key, value, timeout=None):
+        """Stores `value` under `key`, for `timeout` seconds if given."""
+
+    @abstractmethod
+    def clear(self):
+        """Removes every entry."""
+
+    def memoize(self, timeout=None, version=None):
+        """
+        Decorator caching the results of a function under normalized keys of its arguments.
+
+        Parameters:
+            timeout (float, optional): Seconds a result stays valid, forever when None.
+            version (callable, optional): Returns the version of the data the function reads.
+                It is part of every key, so results computed from older data are no longer
+                found once the version changes and age out of the cache.
+        """
+        def decorator(func):
+            name = func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args):
+                key = make_key(name, args, None if version is None else version())
+                value = self.get(key)
+                if value is not self.MISSING:
+                    self.hits[name] += 1
+                    return value
+                self.misses[name] += 1
+                value = func(*args)
+                self.set(key, value, timeout)
+                return value
+
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counts per cached function.
+        """
+        return {
+            name: {"hits": self.hits[name], "misses": self.misses[name]}
+            for name in sorted(set(self.hits) | set(self.misses))
+        }
+
+
+class LRUCache(CallbackCache):
+    """
+    In-process cache that evicts the least recently used entries once their total size exceeds a budget.
+
+    Values are kept as the objects the callbacks returned, so a hit costs no
+    deserialization; their pickled size is only measured once, when they are stored.
+
+    Parameters:
+        max_bytes (int): Budget for the summed pickled size of the cached values.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self.MISSING
+            value, size, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                return self.MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size, expires)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache(CallbackCache):
+    """
+    Cache stored in Redis (or a compatible server), shared by every worker process that connects to it.
+
+    Values are pickled. The memory budget and eviction policy are those configured on the
+    server, e.g. `maxmemory` with `maxmemory-policy allkeys-lru`. Requires the `redis` package.
+
+    Parameters:
+        url (str): Server URL, e.g. redis://localhost:6379/0.
+        prefix (str): Prefix of the keys written, so `clear` leaves other keys alone.
+    """
+
+    def __init__(self, url=REDIS_URL, prefix="hk-tracker:"):
+        import redis  # type: ignore
+
+        super().__init__()
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return self.MISSING if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        self._client.set(
+            self.prefix + key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            ex=None if timeout is None else max(1, int(timeout)),
+        )
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+def make_cache():
+    """
+    Returns the Redis cache when CACHE_REDIS_URL is set, otherwise the in-process LRU cache.
+    """
+    if REDIS_URL:
+        return RedisCache(REDIS_URL)
+    return LRUCache(MAX_BYTES)
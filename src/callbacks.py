@@ -1,39 +1,410 @@
-import pandas as pd
-from flask_caching import Cache
-from dash import Input, Output, dcc, html, ctx # type: ignore
-import plotly.express as px  # type: ignore
-import dash_leaflet as dl  # type: ignore
-import dash_leaflet.express as dlx  # type: ignore
-from src.travel_method import travel_method
-from src.passenger_origin import passenger_origin
-from src.passenger_count import passenger_count
-
-# Load data
-DATA_PATH = "data/processed/data.csv"
-df = pd.read_csv(DATA_PATH)
-
-# Ensure the date column is in datetime format
-df["date"] = pd.to_datetime(df["date"], format="%d-%m-%Y", errors="coerce")  # Adjust format if necessary
-
-def compute_totals(filtered_df):
+import functools
+import json
+import os
+from dash import ClientsideFunction, Input, Output, State, ctx # type: ignore
+from src.cache import make_cache
+from src.components import MAP_CENTER, MAP_ZOOM, default_date_range, filter_options
+from src.metrics import stage
+
+# pandas, plotly, the chart modules and the data are imported inside the callbacks,
+# so importing the app stays fast; import_modules() and warm_up() load them ahead of
+# the first request.
+
+CONTROL_POINTS_PATH = "data/processed/control_points_hk.csv"
+
+# Results of the data callbacks, see src/cache.py for the backends
+cache = make_cache()
+
+# Date ranges, in days up to the last date, precomputed by warm_cache besides the default view,
+# as a comma-separated list, e.g. WARM_RANGES=7,30,90 (the default); empty to skip them
+WARM_RANGES = tuple(int(days) for days in os.environ.get("WARM_RANGES", "7,30,90").split(",") if days.strip())
+
+# Further filter states precomputed by warm_cache, as a JSON list of objects with days (or
+# start_date and end_date), control_points and travel_types, each defaulting to the default view:
+#   WARM_FILTERS='[{"days": 30, "control_points": ["Airport"]}, {"travel_types": ["Arrival"]}]'
+WARM_FILTERS = json.loads(os.environ.get("WARM_FILTERS", "[]"))
+
+# AGGREGATION_MODE controls where the totals and the bar charts are computed:
+#   server (default) every filter change is sent to the server like the other outputs.
+#   client           the daily data is shipped to the browser once per page load and
+#                    src/assets/clientside.js recomputes them without a round trip.
+AGGREGATION_MODE = os.environ.get("AGGREGATION_MODE", "server")
+
+
+def import_modules():
+    """
+    Imports the modules the callbacks and the layout import on first use: pandas, plotly,
+    dash-leaflet's helpers, the chart modules and the data store.
+    """
+    import dash_leaflet.express  # noqa: F401
+    from src import data_store, passenger_count, passenger_origin, summary, travel_method  # noqa: F401
+
+    # plotly takes its optional JSON engine from sys.modules, even while another thread is
+    # still importing it, so it is imported here before any figure is serialized
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        pass
+
+
+def warm_up():
+    """
+    Imports the chart modules, loads the shared data and warms the cache so the first callbacks do not pay for it.
+    """
+    import_modules()
+    warm_cache()
+
+
+def warm_filters(cube, ranges=WARM_RANGES, extra=WARM_FILTERS):
+    """
+    Lists the filter states most visitors request: the default view, the default date range for
+    each single control point, the last `ranges` days for all control points and the `extra` states.
+
+    Parameters:
+        cube (DataCube): The shared data, whose last date anchors the date ranges.
+        ranges (iterable of int): Additional date range lengths in days.
+        extra (list of dict): Additional filter states with days (or start_date and end_date),
+            control_points and travel_types, each defaulting to the default view.
+
+    Returns:
+        list of tuple: start_date, end_date, control_points and travel_types as sent by the page.
+    """
+    last_date = cube.dates[-1].date()
+    travel_types = ["Arrival", "Departure"]
+
+    def date_range(days=None):
+        selection = default_date_range(last_date) if days is None else default_date_range(last_date, days)
+        return selection["start_date"].isoformat(), selection["end_date"].isoformat()
+
+    default_start, default_end = date_range()
+    filters = [(default_start, default_end, None, travel_types)]
+    filters += [(*date_range(days), None, travel_types) for days in ranges]
+    filters += [(default_start, default_end, [cp], travel_types) for cp in cube.members["control_point"]]
+    for state in extra:
+        start_date, end_date = date_range(state["days"]) if "days" in state else (default_start, default_end)
+        filters.append((
+            state.get("start_date", start_date),
+            state.get("end_date", end_date),
+            state.get("control_points"),
+            state.get("travel_types", travel_types),
+        ))
+    return filters
+
+
+def warm_cache(ranges=WARM_RANGES, extra=WARM_FILTERS):
+    """
+    Precomputes the cached callback results for `warm_filters`, e.g. right after the data is loaded or refreshed.
+
+    Parameters:
+        ranges (iterable of int): Additional date range lengths in days, see `warm_filters`.
+        extra (list of dict): Additional filter states, see `warm_filters`.
+    """
+    from src.data_store import get_cube
+
+    cube = get_cube()
+    if AGGREGATION_MODE == "client":
+        client_data()
+
+    filters = warm_filters(cube, ranges, extra)
+    # Pages open on the default view with full figures; filter changes are patches
+    start_date, end_date, control_points, travel_types = filters[0]
+    dashboard(start_date, end_date, control_points, travel_types, True)
+    net_inflow_chart(start_date, end_date, control_points, True)
+    for start_date, end_date, control_points, travel_types in filters:
+        dashboard(start_date, end_date, control_points, travel_types, False)
+        net_inflow_chart(start_date, end_date, control_points, False)
+
+
+def data_version():
+    """
+    Version of the shared data, part of every cache key so cached results live until new data is ingested.
     """
-    Computes total passenger counts and volume entries per 100,000 people based on the filtered dataset.
+    from src.data_store import get_cube
+
+    return get_cube().version
+
+
+@cache.memoize(version=data_version)
+def client_data():
+    """
+    Packs the daily data for the clientside callbacks in src/assets/clientside.js.
+
+    Every (date, control point, travel type, origin) cell is sent as its passenger count,
+    or null when the processed data has no row for it; there is at most one row per cell,
+    so the non-null cells are also the row counts behind the volume entries. The travel
+    method and passenger origin figures are sent as built for the whole date range, and
+    the browser only swaps in the bars for the selected filters.
+
+    Returns:
+        dict: start_date, days, members, travel_methods, counts (flattened in cube order) and figures.
+    """
+    import json
+    from src.data_store import get_cube
+    from src.passenger_origin import passenger_origin
+    from src.summary import Summary
+    from src.travel_method import travel_method
+
+    cube = get_cube()
+    counts = cube.counts.ravel().astype(object)
+    counts[cube.rows.ravel() == 0] = None
+
+    summary = Summary(cube)
+    return {
+        "start_date": cube.dates[0].strftime("%Y-%m-%d"),
+        "days": len(cube.dates),
+        "members": {axis: list(values) for axis, values in cube.members.items()},
+        "travel_methods": list(cube.travel_methods),
+        "counts": counts.tolist(),
+        "figures": {
+            "travel_method": json.loads(travel_method(summary).to_json()),
+            "passenger_origin": json.loads(passenger_origin(summary).to_json()),
+        },
+    }
+
+
+@stage("aggregate")
+def compute_totals(summary):
+    """
+    Computes total passenger counts and volume entries per 100,000 people based on user selections.
 
     Parameters:
-        filtered_df (pd.DataFrame): Filtered DataFrame based on user selections.
+        summary (Summary): Aggregates of the selected date range, control points and travel types.
 
     Returns:
         tuple: Total passenger count as a formatted string and volume entries per 100,000 rounded to 2 decimal places.
     """
-    if filtered_df.empty:
+    if not summary.rows.any():
         return "0", "0"
 
-    total_passengers = filtered_df["passenger_count"].sum()
-    tourist_df = filtered_df[(filtered_df['travel_type'] == 'Arrival') & (filtered_df['passenger_origin'] != 'Hong Kong Residents')]
-    volume_entries = round(len(tourist_df) / 7.54e6 * 100000, 2)
+    total_passengers = summary.counts.sum()
+
+    # Entries are arrival records of visitors, i.e. every origin except Hong Kong residents
+    arrivals = summary.travel_types == "Arrival"
+    visitors = summary.passenger_origins != "Hong Kong Residents"
+    tourist_rows = summary.rows[:, arrivals][:, :, visitors].sum()
+    volume_entries = round(tourist_rows / 7.54e6 * 100000, 2)
 
     return f"{total_passengers:,}", f"{volume_entries:.2f}"
 
+
+@functools.lru_cache(maxsize=None)
+def control_point_locations():
+    """
+    Reads the coordinates of the control points once per process.
+
+    Returns:
+        pd.DataFrame: Latitude and Longitude indexed by control_point.
+    """
+    import pandas as pd
+
+    return pd.read_csv(CONTROL_POINTS_PATH, index_col="control_point")
+
+
+@stage("figure")
+def control_point_markers(summary):
+    """
+    Builds the data of the control point markers and the map view that fits them all.
+
+    The marker properties are computed for all control points at once and sent as a single
+    geobuf-encoded GeoJSON layer, which the page updates in place.
+
+    Parameters:
+        summary (Summary): Aggregates of the selected date range, control points and travel types.
+
+    Returns:
+        tuple: The markers as a base64 geobuf string and the map viewport.
+    """
+    import numpy as np
+    import dash_leaflet.express as dlx  # type: ignore
+
+    passenger_counts = summary.by_control_point()
+    if passenger_counts.empty:
+        empty = {"type": "FeatureCollection", "features": []}
+        return dlx.geojson_to_geobuf(empty), {"center": MAP_CENTER, "zoom": MAP_ZOOM}
+
+    locations = control_point_locations().reindex(passenger_counts["control_point"]).fillna(0)
+    latitudes = locations["Latitude"].to_numpy()
+    longitudes = locations["Longitude"].to_numpy()
+    counts = passenger_counts["passenger_count"].to_numpy()
+
+    radii = np.clip(counts / 1000, 5, 15)
+    tooltips = passenger_counts["control_point"] + ": " + passenger_counts["passenger_count"].map("{:,}".format) + " passengers"
+
+    markers = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+                "properties": {"radius": radius, "tooltip": tooltip},
+            }
+            for latitude, longitude, radius, tooltip in zip(
+                latitudes.tolist(), longitudes.tolist(), radii.tolist(), tooltips.tolist()
+            )
+        ],
+    }
+
+    # Compute bounds to fit all markers
+    bounds = [
+        [latitudes.min(), longitudes.min()],
+        [latitudes.max(), longitudes.max()]
+    ]
+
+    return dlx.geojson_to_geobuf(markers), {"bounds": bounds}
+
+
+# Area colors of the passenger flow chart
+FLOW_COLORS = {"Arrival": "#ADD8E6", "Departure": "#00008B"}  # Changed to light&dark blue
+
+
+@stage("figure")
+def passenger_flow(summary):
+    """
+    Generates an area chart visualizing the net passenger flow over time, categorized by travel type
+    (Arrivals and Departures).
+
+    Parameters:
+        summary (Summary): Aggregates of the selected date range, control points and travel types.
+
+    Returns:
+        plotly.graph_objects.Figure: A Plotly area chart displaying passenger inflow and outflow over time.
+    """
+    import plotly.express as px  # type: ignore
+    from src.summary import chart_title, downsample
+
+    # Passenger counts per date & travel_type, in 7-day or 30-day buckets over long ranges
+    series, granularity = downsample(summary.daily_series())
+    grouped_df = series.stack().rename("passenger_count").reset_index()
+
+    # Create the area chart
+    fig = px.area(
+        grouped_df,
+        x="date",
+        y="passenger_count",
+        color="travel_type",  # Separate Arrivals and Departures
+        labels={"passenger_count": "Passenger Count", "date": "Date", "travel_type": "Travel Type"},
+        title=chart_title("Passenger Flow Over Time", granularity),
+        color_discrete_map=FLOW_COLORS,
+    )
+
+    fig.update_layout(
+        legend_title="Travel Type",  # Set a title for the legend
+        legend=dict(
+            x=1,  # Position legend to the right
+            y=1,
+            bgcolor="white",  # White background for visibility
+            bordercolor="black",
+            borderwidth=1
+        ),
+        plot_bgcolor="white",  # Removes grey background
+        paper_bgcolor="white"  # Ensures no grey on the outer area
+    )
+
+    return fig
+
+
+@stage("figure")
+def passenger_flow_patch(summary):
+    """
+    Partial update of a figure built by `passenger_flow`, replacing only its traces.
+
+    The selected travel types decide how many areas there are, so the traces are replaced
+    as a whole, built as `plotly.express.area` lays them out. Besides the title, which shows
+    the granularity, the layout and template stay as they are in the browser.
+
+    Parameters:
+        summary (Summary): Aggregates of the selected date range, control points and travel types.
+
+    Returns:
+        dash.Patch: Update of the figure's traces and title.
+    """
+    from dash import Patch  # type: ignore
+    from src.summary import chart_title, downsample
+
+    series, granularity = downsample(summary.daily_series())
+    # No traces at all without data, as plotly.express draws it
+    travel_types = [] if series.empty else series.columns
+
+    patched = Patch()
+    patched["layout"]["title"]["text"] = chart_title("Passenger Flow Over Time", granularity)
+    patched["data"] = [
+        {
+            "type": "scatter",
+            "mode": "lines",
+            "stackgroup": "1",
+            "orientation": "v",
+            "name": travel_type,
+            "legendgroup": travel_type,
+            "showlegend": True,
+            "line": {"color": FLOW_COLORS.get(travel_type)},
+            "hovertemplate": f"Travel Type={travel_type}<br>Date=%{{x}}<br>Passenger Count=%{{y}}<extra></extra>",
+            "x": series.index,
+            "y": series[travel_type],
+            "xaxis": "x",
+            "yaxis": "y",
+        }
+        for travel_type in travel_types
+    ]
+    return patched
+
+
+@cache.memoize(version=data_version)
+def dashboard(start_date, end_date, control_points, travel_types, full=True):
+    """
+    Computes the outputs of the `update_dashboard` callback.
+
+    The filters are applied once and every output is derived from the same `Summary`.
+    With AGGREGATION_MODE=client the totals and bar charts are left to the browser.
+
+    Parameters:
+        start_date (str): The start date selected in the date picker.
+        end_date (str): The end date selected in the date picker.
+        control_points (list): List of selected control points.
+        travel_types (list): List of selected travel types (arrival/departure).
+        full (bool): Whether to build the figures, for a page that has none yet, or only
+            patch the data of the figures the page already shows.
+
+    Returns:
+        dict: Map markers and viewport and passenger flow chart, plus total passenger count, volume entries,
+            travel method chart and passenger origin chart in server mode, keyed by component id.
+            A missing date bound means the full dataset range, except for the totals,
+            which are zero until both dates are picked.
+    """
+    from src.data_store import get_cube
+    from src.passenger_origin import passenger_origin, passenger_origin_patch
+    from src.summary import Summary
+    from src.travel_method import travel_method, travel_method_patch
+
+    summary = Summary(get_cube(), start_date, end_date, control_points, travel_types)
+    markers, viewport = control_point_markers(summary)
+    results = {
+        "control_point_markers": markers,
+        "map": viewport,
+        "net_passenger_inflow": passenger_flow(summary) if full else passenger_flow_patch(summary),
+    }
+    if AGGREGATION_MODE != "client":
+        totals = compute_totals(summary) if start_date and end_date else ("0", "0")
+        results.update(
+            total_passengers=totals[0],
+            volume_entries=totals[1],
+            travel_method=travel_method(summary) if full else travel_method_patch(summary),
+            passenger_origin=passenger_origin(summary) if full else passenger_origin_patch(summary),
+        )
+    return results
+
+
+@cache.memoize(version=data_version)
+def net_inflow_chart(start_date, end_date, control_points, full=True):
+    """
+    Computes the output of the `update_passenger_count` callback, a figure when `full`, otherwise a patch.
+    """
+    from src.data_store import get_cube
+    from src.passenger_count import passenger_count, passenger_count_patch
+
+    chart = passenger_count if full else passenger_count_patch
+    return chart(get_cube(), start_date, end_date, control_points)
+
+
 def register_callbacks(app):
     """
     Registers Dash callbacks for updating total passenger counts, passenger count graphs, and the map.
@@ -42,30 +413,38 @@ def register_callbacks(app):
         app (dash.Dash): The Dash application instance.
     """
 
-    # Create cache
-    cache = Cache(
-        app.server,
-        config={
-            'CACHE_TYPE': 'filesystem',
-            'CACHE_DIR': 'tmp'
-        }
-    )
-    TIMEOUT = 30
+    filters = [
+        Input("date_picker", "start_date"),
+        Input("date_picker", "end_date"),
+        Input("control_point_dropdown", "value"),
+        Input("arrival_departure", "value"),
+    ]
+    summary_outputs = {
+        "total_passengers": Output("total_passengers", "children"),
+        "volume_entries": Output("volume_entries", "children"),
+        "travel_method": Output("travel_method", "figure"),
+        "passenger_origin": Output("passenger_origin", "figure"),
+    }
+    outputs = {
+        "control_point_markers": Output("control_point_markers", "data"),
+        "map": Output("map", "viewport"),
+        "net_passenger_inflow": Output("net_passenger_inflow", "figure"),
+    }
+    if AGGREGATION_MODE == "client":
+        app.clientside_callback(
+            ClientsideFunction(namespace="aggregation", function_name="update_summary"),
+            list(summary_outputs.values()),
+            filters + [Input("aggregates", "data")],
+        )
+    else:
+        outputs.update(summary_outputs)
 
-    @app.callback(
-        [Output("total_passengers", "children"),
-         Output("volume_entries", "children")],
-        [
-            Input("date_picker", "start_date"),
-            Input("date_picker", "end_date"),
-            Input("control_point_dropdown", "value"),
-            Input("arrival_departure", "value"),
-        ]
-    )
-    @cache.memoize(timeout=TIMEOUT)
-    def update_total_counts(start_date, end_date, control_points, travel_types):
+    @app.callback(output=outputs, inputs=filters)
+    def update_dashboard(start_date, end_date, control_points, travel_types):
         """
-        Updates the total passenger count and volume entries based on user-selected filters.
+        Updates the totals, map and charts that share the date, control point and travel type filters.
+
+        The first call of a page builds the figures; later filter changes only patch their data.
 
         Parameters:
             start_date (str): The start date selected in the date picker.
@@ -74,22 +453,9 @@ def register_callbacks(app):
             travel_types (list): List of selected travel types (arrival/departure).
 
         Returns:
-            tuple: Updated total passenger count and volume entries.
+            dict: Outputs keyed by component id, see `dashboard`.
         """
-        if not start_date or not end_date:
-            return "0", "0"
-
-        start_date = pd.to_datetime(start_date)
-        end_date = pd.to_datetime(end_date)
-
-        filtered_df = df[(df["date"] >= start_date) & (df["date"] <= end_date)]
-
-        if control_points:
-            filtered_df = filtered_df[filtered_df["control_point"].isin(control_points)]
-        if travel_types:
-            filtered_df = filtered_df[filtered_df["travel_type"].isin(travel_types)]
-
-        return compute_totals(filtered_df)
+        return dashboard(start_date, end_date, control_points, travel_types, ctx.triggered_id is None)
 
     @app.callback(
         Output("passenger_count", "figure"),
@@ -114,196 +480,13 @@ def register_callbacks(app):
 
         Returns
         -------
-        plotly.graph_objects.Figure
-            A Plotly figure showing the net passenger inflow over time
-
-        """
-        try:
-            schema = passenger_count(df, start_date, end_date, control_points)
-        except Exception:
-            schema = passenger_count(df, start_date, end_date, control_points)
-
-        return schema
-
-    @app.callback(
-        Output("map", "children"),
-        [
-            Input("date_picker", "start_date"),
-            Input("date_picker", "end_date"),
-            Input("control_point_dropdown", "value"),
-            Input("arrival_departure", "value")
-        ]
-    )
-    @cache.memoize(timeout=TIMEOUT)
-    def update_map(start_date, end_date, control_points, travel_types):
-        """
-        Updates the map visualization based on user-selected filters, automatically adjusting
-        the view so that all points are visible.
-
-        Parameters:
-            start_date (str): The start date selected in the date picker.
-            end_date (str): The end date selected in the date picker.
-            control_points (list): List of selected control points.
-            travel_types (list): List of selected travel types (arrival/departure).
-
-        Returns:
-            dash_leaflet.Map: A map with CircleMarkers representing passenger counts at control points.
-        """
-        control_points_df = pd.read_csv("data/processed/control_points_hk.csv")
-
-        start_date = pd.to_datetime(start_date) if start_date else df["date"].min()
-        end_date = pd.to_datetime(end_date) if end_date else df["date"].max()
-
-        filtered_df = df[(df["date"] >= start_date) & (df["date"] <= end_date)]
-        if control_points:
-            filtered_df = filtered_df[filtered_df["control_point"].str.strip().isin(control_points)]
-        if travel_types:
-            filtered_df = filtered_df[filtered_df["travel_type"].str.strip().isin(travel_types)]
-
-        if filtered_df.empty:
-            return dl.Map(
-                [dl.TileLayer()],
-                center=[22.3193, 114.1694],
-                zoom=11,
-                style={"height": "500px", "width": "100%"}
-            )
-
-        passenger_counts = filtered_df.groupby("control_point")["passenger_count"].sum().reset_index()
-        control_points_df = control_points_df.merge(passenger_counts, on="control_point", how="right").fillna(0)
-
-        markers = [
-            dl.CircleMarker(
-                center=(row["Latitude"], row["Longitude"]),
-                radius=max(5, min(row["passenger_count"] / 1000, 15)),
-                fill=True,
-                fillOpacity=0.6,
-                children=dl.Tooltip(f"{row['control_point']}: {int(row['passenger_count']):,} passengers")
-            )
-            for _, row in control_points_df.iterrows()
-        ]
+        plotly.graph_objects.Figure or dash.Patch
+            A Plotly figure showing the net passenger inflow over time on the first call
+            of a page, afterwards a patch of its data
 
-        # Compute bounds to fit all markers
-        latitudes = control_points_df["Latitude"].values
-        longitudes = control_points_df["Longitude"].values
-
-        bounds = [
-            [latitudes.min(), longitudes.min()],
-            [latitudes.max(), longitudes.max()]
-        ]
-
-        return dl.Map(
-            [dl.TileLayer()] + markers,
-            bounds=bounds,
-            style={"height": "500px", "width": "100%"}
-        )
-
-    @app.callback(
-    Output("travel_method", "figure"),
-    [
-        Input("date_picker", "start_date"),
-        Input("date_picker", "end_date"),
-        Input("control_point_dropdown", "value"),
-        Input("arrival_departure", "value"),
-    ]
-    )
-    @cache.memoize(timeout=TIMEOUT)
-    def update_travel_method(start_date, end_date, control_point, arrival_departure):
-        return travel_method(start_date, end_date, control_point, arrival_departure)
-    
-    @app.callback(
-    Output("passenger_origin", "figure"),
-    [
-        Input("date_picker", "start_date"),
-        Input("date_picker", "end_date"),
-        Input("control_point_dropdown", "value"),
-        Input("arrival_departure", "value"),
-    ]
-    )
-    @cache.memoize(timeout=TIMEOUT)
-    def update_passenger_origin(start_date, end_date, control_point, travel_types):
-        return passenger_origin(start_date, end_date, control_point, travel_types)
-    
-    @app.callback(
-    Output("net_passenger_inflow", "figure"),
-    [
-        Input("date_picker", "start_date"),
-        Input("date_picker", "end_date"),
-        Input("control_point_dropdown", "value"),
-        Input("arrival_departure", "value"),
-    ],
-)
-    @cache.memoize(timeout=TIMEOUT)
-    def update_net_passenger_flow(start_date, end_date, control_point, travel_types):
-        """
-        Generates an area chart visualizing the net passenger flow over time, categorized by travel type
-        (Arrivals and Departures). The function filters data based on the selected date range, control points,
-        and travel types before aggregating passenger counts.
-
-        Parameters:
-        ----------
-        start_date : str
-            The start date selected in the date picker (ISO format: YYYY-MM-DD).
-        end_date : str
-            The end date selected in the date picker (ISO format: YYYY-MM-DD).
-        control_point : list of str
-            A list of selected control points where passengers enter or exit.
-        travel_types : list of str
-            A list specifying whether to include 'Arrival', 'Departure', or both.
-
-        Returns:
-        -------
-        plotly.graph_objects.Figure
-            A Plotly area chart displaying passenger inflow and outflow over time.
         """
-        # Convert start_date and end_date to datetime, fallback to dataset range
-        start_date = pd.to_datetime(start_date) if start_date else df["date"].min()
-        end_date = pd.to_datetime(end_date) if end_date else df["date"].max()
-
-        # Filter dataset based on date range
-        filtered_df = df[(df["date"] >= start_date) & (df["date"] <= end_date)]
-
-        # Apply control point filtering if selected
-        if control_point:
-            filtered_df = filtered_df[filtered_df["control_point"].isin(control_point)]
-        
-        # Apply control point filtering if selected
-        if travel_types:
-            filtered_df = filtered_df[filtered_df["travel_type"].isin(travel_types)]
-
-        # Ensure required columns exist
-        required_columns = {"date", "travel_type", "passenger_count"}
-        if not required_columns.issubset(df.columns):
-            raise KeyError(f"Missing required columns: {required_columns - set(df.columns)}")
-
-        # Aggregate passenger counts per date & travel_type
-        grouped_df = filtered_df.groupby(["date", "travel_type"])["passenger_count"].sum().reset_index()
-
-        # Create the area chart
-        fig = px.area(
-            grouped_df,
-            x="date",
-            y="passenger_count",
-            color="travel_type",  # Separate Arrivals and Departures
-            labels={"passenger_count": "Passenger Count", "date": "Date", "travel_type": "Travel Type"},
-            title="Passenger Flow Over Time",
-            color_discrete_map={"Arrival": "#ADD8E6", "Departure": "#00008B"},  # Changed to light&dark blue
-        )
+        return net_inflow_chart(start_date, end_date, control_points, ctx.triggered_id is None)
 
-        fig.update_layout(
-            legend_title="Travel Type",  # Set a title for the legend
-            legend=dict(
-                x=1,  # Position legend to the right
-                y=1,
-                bgcolor="white",  # White background for visibility
-                bordercolor="black",
-                borderwidth=1
-            ),
-            plot_bgcolor="white",  # Removes grey background
-            paper_bgcolor="white"  # Ensures no grey on the outer area
-        )
-
-
-        return fig
     @app.callback(
     Output("passenger_modal", "is_open"),  # Output to toggle modal visibility
     [Input("total_passengers", "children"),  # Monitor passenger count
@@ -322,4 +505,42 @@ def register_callbacks(app):
         except ValueError:
             passenger_count = 0
 
-        return passenger_count == 0  # Open modal if passenger count is 0
\ No newline at end of file
+        return passenger_count == 0  # Open modal if passenger count is 0
+
+    refresh_outputs = {
+        "max_date_allowed": Output("date_picker", "max_date_allowed"),
+        "options": Output("control_point_dropdown", "options"),
+        "version": Output("data_version", "data"),
+    }
+    if AGGREGATION_MODE == "client":
+        refresh_outputs["aggregates"] = Output("aggregates", "data")
+
+    @app.callback(
+        output=refresh_outputs,
+        inputs=[Input("refresh_interval", "n_intervals")],
+        state=[State("data_version", "data")],
+        prevent_initial_call=True,
+    )
+    def refresh_filters(n_intervals, version):
+        """
+        Updates the date picker and control point options of an open page once the data is refreshed.
+
+        Parameters:
+            n_intervals (int): Number of checks so far, from the page's refresh interval.
+            version (str): Version of the data the page shows.
+
+        Returns:
+            dict: Last selectable date, control point options and data version, plus the daily data
+                in client mode, or no update while the data is unchanged.
+        """
+        from dash.exceptions import PreventUpdate  # type: ignore
+        from src.data_store import get_cube
+
+        cube = get_cube()
+        if cube.version == version:
+            raise PreventUpdate
+        control_point_options, last_date = filter_options(cube)
+        results = {"max_date_allowed": last_date, "options": control_point_options, "version": cube.version}
+        if AGGREGATION_MODE == "client":
+            results["aggregates"] = client_data()
+        return results
@@ -1,8 +1,82 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from src.data_cube import AXES, DataCube
 
-def clean_data():
-    df = pd.read_csv('data/raw/data.csv')
-    df = df.iloc[:, 1:7]
+RAW_PATH = 'data/raw/data.csv'
+PROCESSED_PATH = 'data/processed/data.feather'
+
+# Processed columns stored dictionary-encoded
+CATEGORICAL_COLUMNS = ['control_point', 'travel_type', 'passenger_origin', 'travel_method']
+
+# Schema of the processed Arrow IPC (Feather V2) file. A row counts one control point's
+# daily passengers of one origin and direction, far below 2**32, so counts take 4 bytes.
+PROCESSED_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('control_point', pa.dictionary(pa.int8(), pa.string())),
+    ('travel_type', pa.dictionary(pa.int8(), pa.string())),
+    ('passenger_origin', pa.dictionary(pa.int8(), pa.string())),
+    ('passenger_count', pa.uint32()),
+    ('travel_method', pa.dictionary(pa.int8(), pa.string())),
+])
+
+# Records what has been ingested so refreshes only process newer rows
+MANIFEST_PATH = 'data/processed/manifest.json'
+
+# Daily cube materialized at ingest and memory-mapped by the app
+CUBE_PATH = 'data/processed/cube'
+
+# Raw rows (control point x travel type x day) read per chunk
+CHUNKSIZE = 50_000
+
+# Processed rows each cube building process should get to be worth its start-up, about a second
+ROWS_PER_WORKER = 5_000_000
+
+
+def classify_travel_method(control_point):
+    """
+    Derives the travel method of a control point from its name.
+
+    Parameters
+    ----------
+    control_point : str
+        Name of the control point
+
+    Returns
+    -------
+    str
+        'by air', 'by sea' or 'by land'
+    """
+    if 'Airport' in control_point:
+        return 'by air'
+    if any(key_word in control_point for key_word in ['Terminal', 'Harbour']):
+        return 'by sea'
+    return 'by land'
+
+
+def clean_chunk(df):
+    """
+    Reshapes a chunk of raw rows into the long processed format.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw rows with Date, Control Point, Arrival / Departure and one count column per passenger origin
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per date, control point, travel type and passenger origin
+    """
     df = df.melt(
         id_vars=df.columns[:3],
         var_name="passenger_origin",
@@ -16,17 +90,321 @@ def clean_data():
             "Arrival / Departure": "travel_type",
         }
     )
-    
-    # Engine Travel Method
-    df['travel_method'] = df['control_point'].apply(lambda x: 
-        'by air' if 'Airport' in x else 
-        'by sea' if any(key_word in x for key_word in ['Terminal', 'Harbour']) else 
-        'by land'
-    )
-    # Export dataframe as csv
-    df.to_csv('data/processed/data.csv')
+
+    # Engine Travel Method: classify each distinct control point once, then look it up by code
+    control_points = pd.Categorical(df['control_point'])
+    lookup = np.array([classify_travel_method(cp) for cp in control_points.categories], dtype=object)
+    df['travel_method'] = lookup[control_points.codes]
+    return df
+
+
+class ProcessedWriter:
+    """
+    Writes processed chunks to an uncompressed, memory-mappable Feather (Arrow IPC) file.
+
+    An Arrow IPC file allows one dictionary per column that can only grow through
+    deltas, so the writer keeps an append-only dictionary per categorical column and
+    encodes every chunk against it.
+
+    Parameters
+    ----------
+    path : str
+        Location of the file to write
+    """
+
+    def __init__(self, path):
+        self.dictionaries = {column: [] for column in CATEGORICAL_COLUMNS}
+        self._writer = pa.ipc.new_file(
+            path, PROCESSED_SCHEMA, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df):
+        """
+        Appends a processed chunk as a record batch.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Rows in the layout returned by clean_chunk, with dates as dd-mm-YYYY strings
+        """
+        arrays = []
+        for field in PROCESSED_SCHEMA:
+            values = df[field.name]
+            if field.name in self.dictionaries:
+                dictionary = self.dictionaries[field.name]
+                known = set(dictionary)
+                dictionary.extend(value for value in pd.unique(values) if value not in known)
+                codes = pd.Categorical(values, categories=dictionary).codes
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes, pa.int8()), pa.array(dictionary, pa.string())
+                ))
+            elif field.name == 'date':
+                dates = pd.to_datetime(values, format='%d-%m-%Y').to_numpy()
+                arrays.append(pa.array(dates).cast(pa.date32()))
+            else:
+                arrays.append(pa.array(values.to_numpy(), field.type))
+        self._writer.write_batch(pa.record_batch(arrays, schema=PROCESSED_SCHEMA))
+
+    def write_table(self, table):
+        """
+        Copies the record batches of a table written by another ProcessedWriter.
+
+        Files written with an older schema, e.g. with int64 counts, are converted; the
+        cast fails rather than wrap around if a value does not fit.
+
+        Parameters
+        ----------
+        table : pa.Table
+            Existing processed data, e.g. the current file opened with memory mapping
+        """
+        if not table.schema.equals(PROCESSED_SCHEMA):
+            table = table.cast(PROCESSED_SCHEMA)
+        for batch in table.to_batches():
+            for column in CATEGORICAL_COLUMNS:
+                self.dictionaries[column] = batch.column(column).dictionary.to_pylist()
+            self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+def to_frame(data):
+    """
+    Converts processed Arrow data to pandas with categorical string columns and datetime64 dates.
+
+    Parameters
+    ----------
+    data : pa.Table or pa.RecordBatch
+        Processed data read from the Feather file
+
+    Returns
+    -------
+    pd.DataFrame
+        The long-format rows
+    """
+    df = data.to_pandas(date_as_object=False)
+    df['date'] = df['date'].astype('datetime64[ns]')
     return df
-    
-    
+
+
+def read_processed(path=PROCESSED_PATH):
+    """
+    Reads the processed Feather file through a memory map.
+
+    Parameters
+    ----------
+    path : str
+        Location of the processed Feather file
+
+    Returns
+    -------
+    pd.DataFrame
+        The long-format dataset
+    """
+    return to_frame(feather.read_table(path, memory_map=True))
+
+
+def build_partition(processed_path, start_date, end_date, members, travel_methods):
+    """
+    Aggregates the processed rows of one date range into its slice of the daily cube.
+
+    Each call memory-maps the processed file and only converts the rows of its own
+    range, so partitions can be built by separate processes.
+
+    Parameters
+    ----------
+    processed_path : str
+        Location of the processed Feather file
+    start_date : pd.Timestamp
+        First day of the partition
+    end_date : pd.Timestamp
+        Last day of the partition
+    members : dict
+        Ordered members of the control_point, travel_type and passenger_origin axes
+    travel_methods : np.ndarray
+        Travel method of each control point, aligned with its axis
+
+    Returns
+    -------
+    tuple
+        Passenger count and row count arrays of the partition's days
+    """
+    table = feather.read_table(processed_path, memory_map=True)
+    in_range = pc.and_(
+        pc.greater_equal(table['date'], pa.scalar(start_date.date(), pa.date32())),
+        pc.less_equal(table['date'], pa.scalar(end_date.date(), pa.date32())),
+    )
+    chunks = (to_frame(batch) for batch in table.filter(in_range).to_batches())
+    dates = pd.date_range(start_date, end_date, freq='D')
+    cube = DataCube.from_chunks(chunks, dates, members, travel_methods)
+    return cube.counts, cube.rows
+
+
+def build_cube(processed_path=PROCESSED_PATH, workers=1):
+    """
+    Aggregates the processed Feather file into the daily cube, one year at a time.
+
+    The years are disjoint slices of the date axis, so with several workers they are
+    aggregated in parallel by a process pool and their slices concatenated in order.
+    Fewer processes are started when there are not ROWS_PER_WORKER rows for each.
+
+    Parameters
+    ----------
+    processed_path : str
+        Location of the processed Feather file
+    workers : int
+        Number of processes aggregating years at once; 1 builds in the calling process
+
+    Returns
+    -------
+    DataCube
+        Daily passenger counts by control point, travel type and passenger origin
+    """
+    table = feather.read_table(processed_path, memory_map=True)
+    batches = table.to_batches()
+
+    bounds = pc.min_max(table['date'])
+    dates = pd.date_range(bounds['min'].as_py(), bounds['max'].as_py(), freq='D')
+    # The last batch's dictionaries hold every member, in order of first appearance
+    members = {axis: pd.Index(batches[-1].column(axis).dictionary.to_pylist()) for axis in AXES[1:]}
+    travel_methods = np.array(
+        [classify_travel_method(cp) for cp in members['control_point']], dtype=object
+    )
+
+    years = [dates[dates.year == year] for year in dates.year.unique()]
+    arguments = (
+        repeat(processed_path), [year[0] for year in years], [year[-1] for year in years],
+        repeat(members), repeat(travel_methods),
+    )
+    workers = min(workers, len(years), max(1, table.num_rows // ROWS_PER_WORKER))
+    if workers > 1:
+        # Spawned rather than forked, as forking a process that has used Arrow's thread pool can hang
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            partitions = list(pool.map(build_partition, *arguments))
+    else:
+        partitions = list(map(build_partition, *arguments))
+
+    counts = np.concatenate([counts for counts, _ in partitions])
+    rows = np.concatenate([rows for _, rows in partitions])
+    return DataCube(dates, members, counts, rows, travel_methods)
+
+
+def read_manifest(path=MANIFEST_PATH):
+    """
+    Reads the ingestion manifest written alongside the processed dataset.
+
+    Parameters
+    ----------
+    path : str
+        Location of the manifest
+
+    Returns
+    -------
+    dict or None
+        last_date (ISO date), raw_rows and processed_rows, or None if no manifest exists
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(last_date, raw_rows, processed_rows, path=MANIFEST_PATH):
+    """
+    Records the last ingested date and the row counts of the raw and processed datasets.
+
+    The manifest is written to a temporary file and swapped in, as the serving processes
+    read it on every refresh and must never see it half written.
+
+    Parameters
+    ----------
+    last_date : pd.Timestamp
+        Latest date present in the processed dataset
+    raw_rows : int
+        Number of rows in the raw CSV
+    processed_rows : int
+        Number of rows in the processed dataset
+    path : str
+        Location of the manifest
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({
+            'last_date': last_date.strftime('%Y-%m-%d'),
+            'raw_rows': int(raw_rows),
+            'processed_rows': int(processed_rows),
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def clean_data(raw_path=RAW_PATH, output_path=PROCESSED_PATH, chunksize=CHUNKSIZE,
+               manifest_path=MANIFEST_PATH, cube_path=CUBE_PATH, workers=1):
+    """
+    Streams the raw dataset into the processed dataset chunk by chunk.
+
+    Only one chunk is held in memory at a time, so peak memory stays bounded
+    as the raw history grows. The daily cube the dashboard reads is then
+    aggregated from the written file and saved next to it.
+
+    Parameters
+    ----------
+    raw_path : str
+        Location of the raw CSV written by load_data.py
+    output_path : str
+        Location of the processed Feather file, replaced atomically once complete
+    chunksize : int
+        Number of raw rows processed per chunk
+    manifest_path : str
+        Location of the ingestion manifest updated after the rebuild
+    cube_path : str or None
+        Directory to materialize the daily cube in, or None to skip it
+    workers : int
+        Number of processes building the cube, see build_cube
+
+    Returns
+    -------
+    int
+        Number of processed rows written
+    """
+    rows_read = 0
+    rows_written = 0
+    last_date = None
+    tmp_path = output_path + '.tmp'
+    with ProcessedWriter(tmp_path) as writer:
+        # Keep Date, Control Point, Arrival / Departure and the three passenger origin columns
+        for chunk in pd.read_csv(raw_path, usecols=range(1, 7), chunksize=chunksize):
+            chunk_last_date = pd.to_datetime(chunk['Date'], format='%d-%m-%Y').max()
+            last_date = chunk_last_date if last_date is None else max(last_date, chunk_last_date)
+            rows_read += len(chunk)
+
+            df = clean_chunk(chunk)
+            writer.write(df)
+            rows_written += len(df)
+    os.replace(tmp_path, output_path)
+
+    if last_date is not None:
+        write_manifest(last_date, rows_read, rows_written, manifest_path)
+        if cube_path is not None:
+            build_cube(output_path, workers).save(cube_path, source=read_manifest(manifest_path))
+    return rows_written
+
+
 if __name__ == "__main__":
-    clean_data()
+    parser = argparse.ArgumentParser(description="Rebuild the processed dataset and the daily cube from the raw CSV.")
+    parser.add_argument("--cube-only", action="store_true",
+                        help="only rebuild the daily cube from the existing processed dataset")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes building the cube, each aggregating one year at a time")
+    args = parser.parse_args()
+    if args.cube_only:
+        build_cube(PROCESSED_PATH, args.workers).save(CUBE_PATH, source=read_manifest(MANIFEST_PATH))
+    else:
+        clean_data(workers=args.workers)
@@ -1,29 +1,30 @@
-from dash import Dash, html, dcc  # type: ignore
+from dash import html, dcc  # type: ignore
 import dash_bootstrap_components as dbc  # type: ignore
-import dash_vega_components as dvc  # type: ignore
-import pandas as pd
-from src.callbacks import register_callbacks  # Import the callback registration function
 from datetime import timedelta
 import dash_loading_spinners as dls # type: ignore
+import dash_leaflet as dl  # type: ignore
+from src.refresher import REFRESH_INTERVAL
 
-# Load data to get control point values
-DATA_PATH = "data/processed/data.csv"
-df = pd.read_csv(DATA_PATH)
+# Initial view of the map, also shown when no control point has data
+MAP_CENTER = [22.3193, 114.1694]
+MAP_ZOOM = 11
 
-# Ensure the date column is in datetime format
-df["date"] = pd.to_datetime(df["date"], format="%d-%m-%Y", errors="coerce")
 
-# Extract unique control points for dropdown options
-control_point_options = [
-    {"label": cp, "value": cp} for cp in df["control_point"].unique()
-]
+def default_date_range(last_date, days=15):
+    """
+    Returns the initial date picker selection: the 15 days up to the last date in the dataset.
 
-# Get the last date in the dataset
-last_date = df["date"].max().date() if not df["date"].isna().all() else None
-DEFAULT_DATE_RANGE = {
-    "start_date": last_date - timedelta(days=15) if last_date else None,
-    "end_date": last_date,
-}
+    Parameters:
+        last_date (datetime.date or None): Last date in the dataset.
+        days (int): Length of the selection in days, counted back from `last_date`.
+
+    Returns:
+        dict: start_date and end_date of the default selection.
+    """
+    return {
+        "start_date": last_date - timedelta(days=days) if last_date else None,
+        "end_date": last_date,
+    }
 
 # --- Modal ---
 passenger_modal = dbc.Modal(
@@ -49,87 +50,115 @@ passenger_modal = dbc.Modal(
 
 
 # --- Sidebar ---
-sidebar = html.Div(
-    [
-        html.H2("Hong Kong Passenger Traffic Tracker", className="display-6"),
-        dbc.Row(
-            [
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody([
-                            html.P("Total Passengers", className="text-center", style={"color": "#00008B", "fontSize": "18px"}),
-                            html.H5(id="total_passengers", className="text-center", style={"color": "#00008B", "fontSize": "22px"}),
-                        ])
+def make_sidebar(control_point_options, last_date):
+    """
+    Builds the sidebar with the summary cards and the filters for the current dataset.
+
+    Parameters:
+        control_point_options (list of dict): Options of the control point dropdown.
+        last_date (datetime.date or None): Last date in the dataset, the latest date users can pick.
+
+    Returns:
+        dash.html.Div: The sidebar.
+    """
+    date_range = default_date_range(last_date)
+    return html.Div(
+        [
+            html.H2("Hong Kong Passenger Traffic Tracker", className="display-6"),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody([
+                                html.P("Total Passengers", className="text-center", style={"color": "#00008B", "fontSize": "18px"}),
+                                html.H5(id="total_passengers", className="text-center", style={"color": "#00008B", "fontSize": "22px"}),
+                            ])
+                        ),
+                        width=12,
+                        className="mb-2",
                     ),
-                    width=12,
-                    className="mb-2",
-                ),
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody([
-                            html.P("Volume of Entries", className="text-center", style={"color": "#00008B", "fontSize": "18px"}),
-                            html.H5(id="volume_entries", className="text-center", style={"color": "#00008B", "fontSize": "22px"}),
-                            html.P("(Entries calculated per 100,000 people)", className="text-center text-muted", style={"fontSize": "12px"}),
-
-                        ])
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody([
+                                html.P("Volume of Entries", className="text-center", style={"color": "#00008B", "fontSize": "18px"}),
+                                html.H5(id="volume_entries", className="text-center", style={"color": "#00008B", "fontSize": "22px"}),
+                                html.P("(Entries calculated per 100,000 people)", className="text-center text-muted", style={"fontSize": "12px"}),
+
+                            ])
+                        ),
+                        width=12,
+                        className="mb-2",
                     ),
-                    width=12,
-                    className="mb-2",
-                ),
-            ],
-            className="mb-3",
-        ),
-        html.Hr(style={"borderColor": "#00008B"}),
-        html.P("Select time period:", style={"color": "#00008B", "fontSize": "16px"}),
-        dcc.DatePickerRange(
-            id="date_picker",
-            start_date=DEFAULT_DATE_RANGE["start_date"],
-            end_date=DEFAULT_DATE_RANGE["end_date"],
-            max_date_allowed=last_date,
-            style={"width": "100%", "color": "#00008B"},
-        ),
-        html.Br(),
-        html.P("Select control point:", style={"color": "#00008B", "fontSize": "16px"}),
-        dcc.Dropdown(
-            id="control_point_dropdown",
-            options=control_point_options,
-            multi=True,
-            placeholder="Select one or more control points",
-            style={"color": "#00008B"},
-        ),
-        html.Br(),
-        dbc.Row(
-            [
-                html.P("Select arrival or departure:", style={"color": "#00008B", "fontSize": "16px"}),
-                dcc.Checklist(
-                    id="arrival_departure",
-                    options=[
-                        {"label": "Arrival", "value": "Arrival"},
-                        {"label": "Departure", "value": "Departure"},
-                    ],
-                    value=["Arrival", "Departure"],
-                    inline=False,
-                    style={"color": "#00008B"},
-                ),
-            ]
-        ),
-    ],
-    className="p-3",
-    style={
-        "width": "20%",
-        "position": "fixed",
-        "height": "100vh",
-        "overflowY": "auto",
-        "borderRight": "2px solid #00008B",
-    },
-)
+                ],
+                className="mb-3",
+            ),
+            html.Hr(style={"borderColor": "#00008B"}),
+            html.P("Select time period:", style={"color": "#00008B", "fontSize": "16px"}),
+            dcc.DatePickerRange(
+                id="date_picker",
+                start_date=date_range["start_date"],
+                end_date=date_range["end_date"],
+                max_date_allowed=last_date,
+                style={"width": "100%", "color": "#00008B"},
+            ),
+            html.Br(),
+            html.P("Select control point:", style={"color": "#00008B", "fontSize": "16px"}),
+            dcc.Dropdown(
+                id="control_point_dropdown",
+                options=control_point_options,
+                multi=True,
+                placeholder="Select one or more control points",
+                style={"color": "#00008B"},
+            ),
+            html.Br(),
+            dbc.Row(
+                [
+                    html.P("Select arrival or departure:", style={"color": "#00008B", "fontSize": "16px"}),
+                    dcc.Checklist(
+                        id="arrival_departure",
+                        options=[
+                            {"label": "Arrival", "value": "Arrival"},
+                            {"label": "Departure", "value": "Departure"},
+                        ],
+                        value=["Arrival", "Departure"],
+                        inline=False,
+                        style={"color": "#00008B"},
+                    ),
+                ]
+            ),
+        ],
+        className="p-3",
+        style={
+            "width": "20%",
+            "position": "fixed",
+            "height": "100vh",
+            "overflowY": "auto",
+            "borderRight": "2px solid #00008B",
+        },
+    )
+
 
 # --- Map Section ---
 map_section = html.Div(
     [
         html.H3("Volume of Control Point Traffic", style={"color": "#00008B", "textAlign": "center"}),
         html.Div(
-            id="map",
+            # Created once; the callbacks only update the markers' data and the viewport
+            dl.Map(
+                [
+                    dl.TileLayer(),
+                    dl.GeoJSON(
+                        id="control_point_markers",
+                        format="geobuf",
+                        # Circle markers drawn by src/assets/map.js
+                        pointToLayer={"variable": "map_markers.point_to_layer"},
+                    ),
+                ],
+                id="map",
+                center=MAP_CENTER,
+                zoom=MAP_ZOOM,
+                style={"height": "500px", "width": "100%"},
+            ),
             style={
                 "width": "500px",
                 "height": "500px",
@@ -233,11 +262,70 @@ content = html.Div(
 )
 
 # Layout setup
-layout = html.Div(
-    [sidebar, content, passenger_modal],
-    style={
-        "fontFamily": "Arial, sans-serif",
-        "color": "#00008B",
-    },
-)
+def build_layout(control_point_options, last_date, aggregates=None, version=None):
+    """
+    Assembles the page layout for the given filter options.
+
+    Parameters:
+        control_point_options (list of dict): Options of the control point dropdown.
+        last_date (datetime.date or None): Last date in the dataset.
+        aggregates (dict, optional): Daily data for the clientside callbacks, see `callbacks.client_data`.
+        version (str, optional): Version of the data the page is built from, see `DataCube.version`.
+
+    Returns:
+        dash.html.Div: The full page layout.
+    """
+    return html.Div(
+        [
+            make_sidebar(control_point_options, last_date),
+            content,
+            passenger_modal,
+            dcc.Store(id="aggregates", data=aggregates),
+            # Checks for refreshed data while the page stays open, see `callbacks.refresh_filters`
+            dcc.Store(id="data_version", data=version),
+            dcc.Interval(id="refresh_interval", interval=REFRESH_INTERVAL * 1000, disabled=not REFRESH_INTERVAL),
+        ],
+        style={
+            "fontFamily": "Arial, sans-serif",
+            "color": "#00008B",
+        },
+    )
+
+
+def filter_options(cube):
+    """
+    Returns the control point dropdown options and the last date users can pick for the data in `cube`.
+    """
+    # Extract unique control points for dropdown options
+    control_point_options = [
+        {"label": cp, "value": cp} for cp in cube.members["control_point"]
+    ]
+
+    # Get the last date in the dataset
+    last_date = cube.dates[-1].date() if len(cube.dates) else None
+    return control_point_options, last_date
+
+
+def layout():
+    """
+    Builds the page layout from the shared data on every page load.
+
+    Reading the data here instead of at import keeps it off the app's startup path.
+
+    Returns:
+        dash.html.Div: The full page layout.
+    """
+    from src.callbacks import AGGREGATION_MODE, client_data
+    from src.data_store import get_cube  # Deferred: loads pandas and the data
+
+    cube = get_cube()
+    control_point_options, last_date = filter_options(cube)
+
+    # Shipped once per page load when the totals and bar charts are computed in the browser
+    aggregates = client_data() if AGGREGATION_MODE == "client" else None
+
+    return build_layout(control_point_options, last_date, aggregates, cube.version)
+
 
+# Same component ids as `layout()` without reading the data, for Dash's callback validation
+validation_layout = build_layout([], None)
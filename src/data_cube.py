@@ -0,0 +1,453 @@
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+# Axes of the cube, in storage order
+AXES = ("date", "control_point", "travel_type", "passenger_origin")
+
+# Arrays saved as one .npy file each by DataCube.save
+ARRAYS = ("counts", "rows", "cumulative_counts", "cumulative_rows")
+
+# Types of the arrays. A cell holds one day's passengers of one control point, travel type
+# and origin, far below 2**32, from a single source row; only the prefix sums are widened.
+DTYPES = {"counts": np.uint32, "rows": np.uint8, "cumulative_counts": np.int64, "cumulative_rows": np.int64}
+
+
+class DataCube:
+    """
+    Dense array of daily passenger counts indexed by (date, control_point, travel_type, passenger_origin).
+
+    Any dashboard aggregate is a slice of the date axis plus member subsets on the
+    other axes, reduced over the axes that are not kept. Alongside the counts the
+    cube tracks how many source rows fall into every cell, so callers can tell an
+    observed zero apart from a combination that does not exist in the data.
+
+    Both arrays also keep a cumulative sum along the date axis, so the total of any
+    series over a date range is the difference of two lookups, however wide the range.
+
+    `version` identifies the data the cube holds: its last day and a hash of its axes
+    and arrays, so it changes whenever rows are added or counts are revised and results
+    derived from the cube can be cached under it.
+
+    Parameters:
+        dates (pd.DatetimeIndex): Every day from the first to the last date in the data.
+        members (dict): Ordered members of the control_point, travel_type and passenger_origin axes.
+        counts (np.ndarray): uint32 passenger counts with shape (dates, control points, travel types, origins).
+        rows (np.ndarray): uint8 number of source rows per cell, same shape as `counts`.
+        travel_methods (np.ndarray): Travel method of each control point, aligned with its axis.
+        cumulative_counts (np.ndarray, optional): Precomputed prefix sums of `counts`.
+        cumulative_rows (np.ndarray, optional): Precomputed prefix sums of `rows`.
+        version (str, optional): Precomputed `version`, e.g. as saved alongside the arrays.
+    """
+
+    def __init__(self, dates, members, counts, rows, travel_methods,
+                 cumulative_counts=None, cumulative_rows=None, version=None):
+        self.dates = dates
+        self.members = members
+        self.counts = counts
+        self.rows = rows
+        self.travel_methods = travel_methods
+        self.cumulative_counts = _prefix_sum(counts) if cumulative_counts is None else cumulative_counts
+        self.cumulative_rows = _prefix_sum(rows) if cumulative_rows is None else cumulative_rows
+        self._positions = {
+            axis: {member: i for i, member in enumerate(values)}
+            for axis, values in members.items()
+        }
+        self.version = _fingerprint(dates, members, counts, rows) if version is None else version
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Builds the cube from the long-format processed dataset.
+
+        Parameters:
+            df (pd.DataFrame): Dataset with date, control_point, travel_type, passenger_origin,
+                travel_method and passenger_count columns.
+
+        Returns:
+            DataCube: The aggregated cube.
+        """
+        dates = pd.date_range(df["date"].min(), df["date"].max(), freq="D")
+        # Members keep their order of first appearance, e.g. control points as published
+        members = {
+            axis: pd.Index(df[axis].astype(str).unique())
+            for axis in AXES[1:]
+        }
+        counts, rows = _aggregate(df, dates, members)
+
+        methods = (
+            df[["control_point", "travel_method"]].astype(str)
+            .drop_duplicates("control_point")
+            .set_index("control_point")["travel_method"]
+        )
+
+        return cls(dates, members, counts, rows, methods.reindex(members["control_point"]).to_numpy())
+
+    @classmethod
+    def from_chunks(cls, chunks, dates, members, travel_methods):
+        """
+        Builds the cube by aggregating long-format chunks one at a time, for bounded memory.
+
+        Parameters:
+            chunks (iterable of pd.DataFrame): Long-format rows whose dates and members all appear
+                in `dates` and `members`.
+            dates (pd.DatetimeIndex): Days of the date axis.
+            members (dict): Ordered members of the control_point, travel_type and passenger_origin axes.
+            travel_methods (np.ndarray): Travel method of each control point, aligned with its axis.
+
+        Returns:
+            DataCube: The aggregated cube.
+        """
+        shape = (len(dates),) + tuple(len(values) for values in members.values())
+        counts = np.zeros(shape, dtype=DTYPES["counts"])
+        rows = np.zeros(shape, dtype=DTYPES["rows"])
+        for df in chunks:
+            chunk_counts, chunk_rows = _aggregate(df, dates, members)
+            counts += chunk_counts
+            rows += chunk_rows
+        return cls(dates, members, counts, rows, travel_methods)
+
+    def extend(self, df):
+        """
+        Returns a new cube with rows dated after the last day of this cube appended.
+
+        Only the new rows are aggregated and the prefix sums continue from the current
+        last entry, so the cost follows the size of the new data.
+
+        Parameters:
+            df (pd.DataFrame): New long-format rows, all dated after `self.dates[-1]`.
+
+        Returns:
+            DataCube: The extended cube, or this cube when `df` is empty.
+
+        Raises:
+            ValueError: If the new rows overlap the cube's dates or introduce unknown members.
+        """
+        if df.empty:
+            return self
+        if df["date"].min() <= self.dates[-1]:
+            raise ValueError("New rows must be dated after the last day in the cube")
+        for axis, values in self.members.items():
+            if (member_codes(df[axis], values) < 0).any():
+                raise ValueError(f"New rows introduce unknown {axis} members")
+
+        dates = pd.date_range(self.dates[-1] + pd.Timedelta(days=1), df["date"].max(), freq="D")
+        counts, rows = _aggregate(df, dates, self.members)
+        return DataCube(
+            self.dates.append(dates),
+            self.members,
+            np.concatenate([self.counts, counts]),
+            np.concatenate([self.rows, rows]),
+            self.travel_methods,
+            np.concatenate([self.cumulative_counts, self.cumulative_counts[-1] + _prefix_sum(counts)[1:]]),
+            np.concatenate([self.cumulative_rows, self.cumulative_rows[-1] + _prefix_sum(rows)[1:]]),
+        )
+
+    def save(self, directory, source=None):
+        """
+        Writes the cube as one .npy file per array plus a JSON description of its axes.
+
+        Every file is written to a uniquely named temporary file next to its final name and
+        then swapped in, and the JSON description goes last, so a reader never sees it ahead
+        of matching arrays and processes saving at the same time do not write into each other.
+
+        Parameters:
+            directory (str): Directory to write the cube to, created if missing.
+            source (dict, optional): Description of the data the cube was built from,
+                returned by `load_source` to check whether a saved cube is still current.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            with _replace(os.path.join(directory, f"{name}.npy"), "wb") as f:
+                np.save(f, getattr(self, name))
+
+        axes = {
+            "start_date": self.dates[0].strftime("%Y-%m-%d"),
+            "days": len(self.dates),
+            "members": {axis: list(values) for axis, values in self.members.items()},
+            "travel_methods": list(self.travel_methods),
+            "version": self.version,
+            "source": source,
+        }
+        with _replace(os.path.join(directory, "cube.json"), "w") as f:
+            json.dump(axes, f, indent=2)
+
+    @staticmethod
+    def load_source(directory):
+        """
+        Returns the `source` recorded by `save`, or None if no cube is saved in `directory`.
+        """
+        try:
+            with open(os.path.join(directory, "cube.json")) as f:
+                return json.load(f)["source"]
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Opens a cube written by `save`.
+
+        With the default read-only memory mapping every process that opens the same
+        files shares one copy of the arrays through the operating system's page cache.
+
+        Parameters:
+            directory (str): Directory the cube was saved to.
+            mmap_mode (str, optional): Memory-map mode passed to `np.load`, None to read into memory.
+
+        Returns:
+            DataCube: The saved cube.
+
+        Raises:
+            ValueError: If the arrays do not match the saved axes, e.g. while a save is in progress,
+                or were saved with other types than `DTYPES`.
+        """
+        with open(os.path.join(directory, "cube.json")) as f:
+            axes = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAYS
+        }
+
+        members = {axis: pd.Index(values) for axis, values in axes["members"].items()}
+        shape = tuple(len(values) for values in members.values())
+        for name, values in arrays.items():
+            days = axes["days"] + 1 if name.startswith("cumulative") else axes["days"]
+            if values.shape != (days,) + shape:
+                raise ValueError(f"Saved cube arrays in {directory} do not match its axes")
+            if values.dtype != DTYPES[name]:
+                raise ValueError(f"Saved cube array {name} in {directory} has type {values.dtype}")
+
+        return cls(
+            pd.date_range(axes["start_date"], periods=axes["days"], freq="D"),
+            members,
+            arrays["counts"],
+            arrays["rows"],
+            np.array(axes["travel_methods"], dtype=object),
+            arrays["cumulative_counts"],
+            arrays["cumulative_rows"],
+            # Cubes saved before the version was recorded have it computed from the arrays
+            axes.get("version"),
+        )
+
+    def date_slice(self, start_date=None, end_date=None):
+        """
+        Converts an inclusive date range into a slice of the date axis.
+
+        The axis holds every day in order, so the range is found by binary search and
+        every query over it reads one contiguous block of days, never the other days.
+
+        Parameters:
+            start_date (str or pd.Timestamp, optional): First day of the range, defaults to the first day in the data.
+            end_date (str or pd.Timestamp, optional): Last day of the range, defaults to the last day in the data.
+
+        Returns:
+            slice: Positions of the days within the range.
+        """
+        start = self.dates.searchsorted(pd.to_datetime(start_date), side="left") if start_date else 0
+        stop = self.dates.searchsorted(pd.to_datetime(end_date), side="right") if end_date else len(self.dates)
+        return slice(start, max(start, stop))
+
+    def member_index(self, axis, selected):
+        """
+        Converts selected members of an axis into positions along that axis.
+
+        Parameters:
+            axis (str): One of control_point, travel_type or passenger_origin.
+            selected (list of str, optional): Members to keep. None or empty keeps every member.
+
+        Returns:
+            np.ndarray: Sorted, unique positions of the selected members; unknown members are ignored.
+        """
+        if not selected:
+            return np.arange(len(self.members[axis]))
+        positions = self._positions[axis]
+        return np.unique(np.array([positions[member] for member in selected if member in positions], dtype=np.intp))
+
+    def range_totals(self, start_date=None, end_date=None, measure="passenger_count"):
+        """
+        Totals every (control_point, travel_type, passenger_origin) series over an inclusive date range.
+
+        Parameters:
+            start_date (str or pd.Timestamp, optional): First day of the range.
+            end_date (str or pd.Timestamp, optional): Last day of the range.
+            measure (str): "passenger_count" for passenger totals or "rows" for source row counts.
+
+        Returns:
+            np.ndarray: Totals with shape (control points, travel types, origins).
+        """
+        cumulative = self.cumulative_rows if measure == "rows" else self.cumulative_counts
+        dates = self.date_slice(start_date, end_date)
+        return cumulative[dates.stop] - cumulative[dates.start]
+
+    def _reduce(self, measure, start_date, end_date, control_points, travel_types, passenger_origins, keep):
+        if "date" in keep:
+            values = self.rows if measure == "rows" else self.counts
+            subset = values[self.date_slice(start_date, end_date)]
+        else:
+            # Without a date axis in the result the range collapses to a prefix-sum difference
+            subset = self.range_totals(start_date, end_date, measure)[np.newaxis]
+        selections = {
+            "control_point": control_points,
+            "travel_type": travel_types,
+            "passenger_origin": passenger_origins,
+        }
+        for axis, selected in selections.items():
+            if selected:
+                subset = subset.take(self.member_index(axis, selected), axis=AXES.index(axis))
+        reduced_axes = tuple(i for i, axis in enumerate(AXES) if axis not in keep)
+        return subset.sum(axis=reduced_axes, dtype=np.int64)
+
+    def query(self, start_date=None, end_date=None, control_points=None, travel_types=None,
+              passenger_origins=None, keep=()):
+        """
+        Sums passenger counts over a date range and member subsets.
+
+        Parameters:
+            start_date (str or pd.Timestamp, optional): First day of the range.
+            end_date (str or pd.Timestamp, optional): Last day of the range.
+            control_points (list of str, optional): Control points to include, all when empty.
+            travel_types (list of str, optional): Travel types to include, all when empty.
+            passenger_origins (list of str, optional): Passenger origins to include, all when empty.
+            keep (tuple of str): Axes to keep in the result instead of summing over them, in cube order.
+
+        Returns:
+            np.ndarray: Passenger counts over the kept axes, or a scalar when nothing is kept.
+        """
+        return self._reduce("passenger_count", start_date, end_date, control_points, travel_types,
+                            passenger_origins, keep)
+
+    def count_rows(self, start_date=None, end_date=None, control_points=None, travel_types=None,
+                   passenger_origins=None, keep=()):
+        """
+        Counts source rows over a date range and member subsets.
+
+        Takes the same arguments as `query` and returns row counts instead of passenger counts.
+        """
+        return self._reduce("rows", start_date, end_date, control_points, travel_types,
+                            passenger_origins, keep)
+
+    def daily_series(self, start_date=None, end_date=None, control_points=None, travel_types=None):
+        """
+        Daily passenger totals per travel type, as plotted by the time-series charts.
+
+        Parameters:
+            start_date (str or pd.Timestamp, optional): First day of the range.
+            end_date (str or pd.Timestamp, optional): Last day of the range.
+            control_points (list of str, optional): Control points to include, all when empty.
+            travel_types (list of str, optional): Travel types to include, all when empty.
+
+        Returns:
+            pd.DataFrame: One row per day with data in the range and one column per selected travel type.
+        """
+        totals = self.query(start_date, end_date, control_points, travel_types, keep=("date", "travel_type"))
+        rows = self.count_rows(start_date, end_date, control_points, travel_types, keep=("date",))
+        series = pd.DataFrame(
+            totals,
+            index=self.dates[self.date_slice(start_date, end_date)].rename("date"),
+            columns=self.selected_members("travel_type", travel_types).rename("travel_type"),
+        )
+        return series[rows > 0]
+
+    def selected_members(self, axis, selected):
+        """
+        Returns the members of an axis that a selection resolves to, in axis order.
+
+        Parameters:
+            axis (str): One of control_point, travel_type or passenger_origin.
+            selected (list of str, optional): Members to keep. None or empty keeps every member.
+
+        Returns:
+            pd.Index: The selected members.
+        """
+        return self.members[axis][self.member_index(axis, selected)]
+
+
+def member_codes(values, members):
+    """
+    Positions of long-format values along a cube axis, e.g. of a control_point column.
+
+    Categorical columns, as read from the processed file, are looked up once per category
+    and the positions spread to the rows through their integer codes, so no row's string
+    is hashed or compared.
+
+    Parameters:
+        values (pd.Series): Member names, categorical or not.
+        members (pd.Index): Ordered members of the axis.
+
+    Returns:
+        np.ndarray: Position of every row's member, -1 where it is missing or not a member.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, which picks the -1 appended last
+        positions = np.append(members.get_indexer(values.cat.categories.astype(str)), -1)
+        return positions[values.cat.codes.to_numpy()]
+    return members.get_indexer(values.astype(str))
+
+
+def _aggregate(df, dates, members):
+    """
+    Sums passenger counts and source rows of a long-format frame into dense arrays.
+
+    Parameters:
+        df (pd.DataFrame): Long-format rows whose dates and members all appear in `dates` and `members`.
+        dates (pd.DatetimeIndex): Days of the date axis.
+        members (dict): Ordered members of the other axes.
+
+    Returns:
+        tuple: Passenger count and row count arrays of shape (dates, control points, travel types, origins).
+    """
+    shape = (len(dates),) + tuple(len(values) for values in members.values())
+
+    # Flat cell position of every row, so the aggregation is a single bincount
+    days = (df["date"].to_numpy() - dates[0].to_datetime64()) // np.timedelta64(1, "D")
+    codes = [days] + [member_codes(df[axis], members[axis]) for axis in AXES[1:]]
+    flat = np.ravel_multi_index(codes, shape)
+
+    size = int(np.prod(shape))
+    counts = np.bincount(flat, weights=df["passenger_count"], minlength=size)
+    rows = np.bincount(flat, minlength=size)
+    return counts.astype(DTYPES["counts"]).reshape(shape), rows.astype(DTYPES["rows"]).reshape(shape)
+
+
+def _fingerprint(dates, members, counts, rows):
+    """
+    Version of the data in a cube: its last day and a hash of its axes and arrays.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    axes = [dates[0].strftime("%Y-%m-%d"), {axis: list(values) for axis, values in members.items()}]
+    digest.update(json.dumps(axes).encode())
+    for values in (counts, rows):
+        digest.update(np.ascontiguousarray(values).data)
+    return f"{dates[-1]:%Y-%m-%d}/{digest.hexdigest()}"
+
+
+@contextmanager
+def _replace(path, mode):
+    """
+    Opens a uniquely named temporary file next to `path` and swaps it in once the block succeeds.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _prefix_sum(values):
+    """
+    Cumulative sum along the date axis with a leading zero slice.
+
+    Entry `i` holds the total of the first `i` days, so days `[start, stop)` sum to
+    `result[stop] - result[start]`.
+    """
+    cumulative = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    return cumulative
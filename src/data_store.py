@@ -0,0 +1,104 @@
+import fcntl
+import threading
+from src.clean_data import CUBE_PATH, MANIFEST_PATH, PROCESSED_PATH, build_cube, read_manifest
+from src.data_cube import DataCube
+from src.refresher import LOCK_PATH
+
+# Processed dataset written by clean_data.py
+DATA_PATH = PROCESSED_PATH
+
+_lock = threading.RLock()
+_cube = None
+
+
+def load_cube(path=CUBE_PATH, manifest_path=MANIFEST_PATH):
+    """
+    Memory-maps the saved cube if it matches the ingested data, otherwise builds and saves it.
+
+    The cube is materialized by clean_data.py and refresh_data.py and records the ingestion
+    manifest it was built from; it is only rebuilt here if it is missing or stale, and is then
+    opened read-only by every worker. Workers starting together rebuild it once: the rebuild
+    holds the refresh lock and the others wait for it, then load the saved cube. Without a
+    manifest there is nothing to check a saved cube against and it is built in memory.
+
+    Parameters:
+        path (str): Directory of the saved cube.
+        manifest_path (str): Ingestion manifest written by clean_data.py.
+
+    Returns:
+        DataCube: The cube, backed by read-only memory-mapped arrays when saved.
+    """
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        return build_cube(DATA_PATH)
+    cube = _load_current(path, manifest)
+    if cube is not None:
+        return cube
+
+    with open(LOCK_PATH, "a+") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # Another process may have saved a current cube while this one waited
+        manifest = read_manifest(manifest_path)
+        cube = _load_current(path, manifest)
+        if cube is None:
+            build_cube(DATA_PATH).save(path, source=manifest)
+            cube = DataCube.load(path)
+    return cube
+
+
+def _load_current(path, manifest):
+    """Returns the saved cube if it was built from `manifest` and reads back whole, otherwise None."""
+    if DataCube.load_source(path) != manifest:
+        return None
+    try:
+        return DataCube.load(path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def get_cube():
+    """
+    Returns the process-wide aggregated cube, loading or building it on first use.
+
+    Returns:
+        DataCube: Daily passenger counts by control point, travel type and passenger origin.
+    """
+    global _cube
+    if _cube is None:
+        with _lock:
+            if _cube is None:
+                _cube = load_cube()
+    return _cube
+
+
+def reload_cube(path=CUBE_PATH, manifest_path=MANIFEST_PATH):
+    """
+    Swaps in the saved cube once ingestion has moved past the cube in use, e.g. after a refresh.
+
+    The new cube replaces the old one in a single assignment, so callbacks already running
+    finish on the data they started with while later ones read the new data. Nothing is
+    loaded while the cube of the latest ingestion is still being saved, or if the cube
+    has not been used yet, since the next `get_cube()` loads the current one anyway.
+
+    Parameters:
+        path (str): Directory of the saved cube.
+        manifest_path (str): Ingestion manifest written by clean_data.py and refresh_data.py.
+
+    Returns:
+        bool: Whether a new cube was swapped in.
+    """
+    global _cube
+    manifest = read_manifest(manifest_path)
+    if _cube is None or manifest is None or DataCube.load_source(path) != manifest:
+        return False
+    try:
+        cube = DataCube.load(path)
+    except (FileNotFoundError, ValueError):
+        # Files replaced while they were read; the next call finds them complete
+        return False
+
+    with _lock:
+        if cube.version == _cube.version:
+            return False
+        _cube = cube
+    return True
@@ -0,0 +1,211 @@
+import bisect
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from flask import Response, g, has_request_context, request
+
+# Path of the Prometheus endpoint on the Flask server, empty to leave it out
+METRICS_PATH = os.environ.get("METRICS_PATH", "/metrics")
+
+# Stages of a callback request. The first three are timed where the callbacks run them;
+# serialize is the rest of the request: decoding the inputs, cache lookups and encoding the outputs as JSON.
+STAGES = ("filter", "aggregate", "figure", "serialize")
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = tuple(2 ** exponent for exponent in range(8, 25, 2))
+
+
+class Histogram:
+    """
+    Bucket counts and sum of observed values, exposed as a Prometheus histogram.
+
+    Parameters:
+        buckets (tuple): Increasing upper bounds of the buckets, the +Inf bucket is implied.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        """Returns the _bucket, _sum and _count samples with the given label string, e.g. 'callback="x"'."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class RequestTimer:
+    """
+    Stage times of the callback request being handled, kept on `flask.g`.
+
+    Stages can nest, e.g. a figure built from an aggregate, and each only counts the
+    time not spent in the stages nested in it, so the stages add up to the time timed.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = Counter()
+        self._nested = []
+
+    def enter(self):
+        self._nested.append(0.0)
+
+    def exit(self, name, elapsed):
+        self.stages[name] += elapsed - self._nested.pop()
+        if self._nested:
+            self._nested[-1] += elapsed
+
+
+class Metrics:
+    """
+    Latency, stage and payload metrics of the Dash callbacks, served in the Prometheus text format.
+
+    Every /_dash-update-component request is recorded under the name of the callback it runs.
+    Metrics are kept per process, so with several gunicorn workers each serves its own.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(lambda: Histogram(SECONDS_BUCKETS))
+        self.stages = defaultdict(lambda: Histogram(SECONDS_BUCKETS))
+        self.payloads = defaultdict(lambda: Histogram(BYTES_BUCKETS))
+        self.errors = Counter()
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a stage of the callback request being handled; does nothing outside of one.
+
+        Usable as a context manager or as a decorator, e.g. `@metrics.stage("aggregate")`.
+
+        Parameters:
+            name (str): One of `STAGES` but serialize.
+        """
+        timer = g.get("request_timer") if has_request_context() else None
+        if timer is None:
+            yield
+            return
+        start = time.perf_counter()
+        timer.enter()
+        try:
+            yield
+        finally:
+            timer.exit(name, time.perf_counter() - start)
+
+    def observe(self, callback, timer, status, size):
+        """
+        Records a finished callback request.
+
+        Parameters:
+            callback (str): Name of the callback function.
+            timer (RequestTimer): Stage times of the request.
+            status (int): HTTP status of the response.
+            size (int): Size of the response body in bytes.
+        """
+        elapsed = time.perf_counter() - timer.start
+        stages = dict(timer.stages, serialize=max(0.0, elapsed - sum(timer.stages.values())))
+        with self._lock:
+            self.durations[callback].observe(elapsed)
+            # Results found in the cache skip the other stages, which are then not observed
+            for name, seconds in stages.items():
+                self.stages[callback, name].observe(seconds)
+            self.payloads[callback].observe(size)
+            if status >= 400:
+                self.errors[callback] += 1
+
+    def init_app(self, app, cache=None, path=METRICS_PATH):
+        """
+        Records the callback requests of a Dash app and serves the metrics on its Flask server.
+
+        Parameters:
+            app (dash.Dash): The Dash application instance, with its callbacks registered.
+            cache (CallbackCache, optional): Cache whose hits and misses are reported.
+            path (str): Path of the metrics endpoint, none is added when empty.
+        """
+        self._cache = cache
+        update_path = app.config.routes_pathname_prefix + "_dash-update-component"
+
+        @app.server.before_request
+        def start_request_timer():
+            if request.path == update_path:
+                g.request_timer = RequestTimer()
+
+        @app.server.after_request
+        def record_request(response):
+            timer = g.get("request_timer")
+            if timer is not None:
+                output = (request.get_json(silent=True) or {}).get("output")
+                callback = app.callback_map.get(output, {}).get("callback")
+                name = getattr(callback, "__name__", output)
+                self.observe(name, timer, response.status_code, response.calculate_content_length() or 0)
+            return response
+
+        if path:
+            app.server.add_url_rule(
+                path, "metrics", lambda: Response(self.render(), mimetype="text/plain; version=0.0.4")
+            )
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP hk_tracker_callback_duration_seconds Wall time of callback requests.",
+                "# TYPE hk_tracker_callback_duration_seconds histogram",
+            ]
+            for callback, histogram in sorted(self.durations.items()):
+                lines += histogram.lines("hk_tracker_callback_duration_seconds", f'callback="{callback}"')
+
+            lines += [
+                "# HELP hk_tracker_callback_stage_seconds Wall time of callback requests per stage.",
+                "# TYPE hk_tracker_callback_stage_seconds histogram",
+            ]
+            for (callback, name), histogram in sorted(self.stages.items()):
+                lines += histogram.lines("hk_tracker_callback_stage_seconds", f'callback="{callback}",stage="{name}"')
+
+            lines += [
+                "# HELP hk_tracker_callback_response_bytes Size of callback responses.",
+                "# TYPE hk_tracker_callback_response_bytes histogram",
+            ]
+            for callback, histogram in sorted(self.payloads.items()):
+                lines += histogram.lines("hk_tracker_callback_response_bytes", f'callback="{callback}"')
+
+            lines += [
+                "# HELP hk_tracker_callback_errors_total Callback requests answered with an error status.",
+                "# TYPE hk_tracker_callback_errors_total counter",
+            ]
+            lines += [f'hk_tracker_callback_errors_total{{callback="{callback}"}} {count}'
+                      for callback, count in sorted(self.errors.items())]
+
+        if self._cache is not None:
+            stats = self._cache.stats()
+            for result, description in (("hits", "found in"), ("misses", "computed and stored in")):
+                lines += [
+                    f"# HELP hk_tracker_cache_{result}_total Callback results {description} the cache.",
+                    f"# TYPE hk_tracker_cache_{result}_total counter",
+                ]
+                lines += [f'hk_tracker_cache_{result}_total{{function="{function}"}} {counts[result]}'
+                          for function, counts in stats.items()]
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of this process, registered on the app in src/app.py
+metrics = Metrics()
+stage = metrics.stage
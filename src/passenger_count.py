@@ -2,18 +2,86 @@
 # Author: Paramveer Singh
 # 25 February 2025
 
-import pandas as pd
+import numpy as np
 import plotly.graph_objects
-import plotly.express as px
+from dash import Patch  # type: ignore
+from src.bar_trace import bar_trace
+from src.metrics import stage
+from src.summary import chart_title, downsample
 
-def passenger_count(df, start_date, end_date, control_point: list[str] = None) -> plotly.graph_objects.Figure:
+# Define colorblind-friendly colors
+# Derived from "Coloring for Colorblindness" by David Nichols
+# https://davidmathlogic.com/colorblind/
+POSITIVE_COLOR = '#00008B'
+NEGATIVE_COLOR = '#DC3220'
+
+LABELS = {'date': 'Date', 'difference': 'Net passenger inflow (count)'}
+
+
+def net_inflow(cube, start_date, end_date, control_point=None):
+    """
+    Daily Arrival and Departure totals and their difference, with the bar color of each day.
+
+    Ranges longer than `summary.MAX_POINTS` days are summed into 7-day or 30-day buckets.
+
+    Parameters
+    ----------
+    cube : DataCube
+        The shared aggregated passenger counts from `data_store.get_cube()`
+    start_date : Date
+        Start date of the data to look at
+    end_date : Date
+        End date of the data to look at
+    control_point : list[str], optional
+        Control point to filter for. Defaults to None for all control points
+
+    Returns
+    -------
+    tuple
+        DataFrame with date, Arrival, Departure and difference columns, an array of bar colors
+        and the granularity of the dates
+    """
+    # Daily Arrival and Departure totals, sliced from the series materialized at ingest
+    with stage('filter'):
+        series = cube.daily_series(start_date, end_date, control_point, ['Arrival', 'Departure'])
+    series, granularity = downsample(series)
+    filtered_df = series.reset_index()
+    filtered_df['difference'] = filtered_df['Arrival'] - filtered_df['Departure']
+
+    # Color list
+    colors = np.where(filtered_df['difference'] > 0, POSITIVE_COLOR, NEGATIVE_COLOR)
+    return filtered_df, colors, granularity
+
+
+def net_inflow_bars(filtered_df, colors):
+    """
+    Bar trace of the net passenger inflow, shared by `passenger_count` and `passenger_count_patch`.
+
+    Parameters
+    ----------
+    filtered_df : pd.DataFrame
+        Net inflow per date, as returned by `net_inflow`
+    colors : np.ndarray
+        Bar color of each date, as returned by `net_inflow`
+
+    Returns
+    -------
+    list of dict
+        The bar trace, or no trace without data
+    """
+    return bar_trace(filtered_df, 'date', 'difference', LABELS, orientation='v',
+                     hover_data=['Arrival', 'Departure'], marker={'color': colors, 'line': {'width': 0}})
+
+
+@stage('figure')
+def passenger_count(cube, start_date, end_date, control_point: list[str] = None) -> plotly.graph_objects.Figure:
     """
     Function used with callback to return passenger count chart
 
     Parameters
     ----------
-    df : pd.DataFrame
-        Loaded Hong Kong traffic dataframe
+    cube : DataCube
+        The shared aggregated passenger counts from `data_store.get_cube()`
     start_date : Date
         Start date of the data to look at
     end_date : Date
@@ -28,64 +96,19 @@ def passenger_count(df, start_date, end_date, control_point: list[str] = None) -
 
     Example
     -------
-    >>> passenger_count('01-01-2025', '01-20-2025', ['Airport', 'China Ferry Terminal'])
+    >>> passenger_count(get_cube(), '01-01-2025', '01-20-2025', ['Airport', 'China Ferry Terminal'])
     """
-    # Drop unnamed column
-    df = df.drop(columns='Unnamed: 0')
-
-    # Convert dates to datetime
-    start_date = pd.to_datetime(start_date)
-    end_date = pd.to_datetime(end_date)
-
-    # Pivot dataframe to calculate difference for all passenger types
-    diff_df = df.pivot(index=['date', 'control_point', 'passenger_origin'],
-                       columns=['travel_type'],
-                       values='passenger_count'
-                       ).reset_index(
-
-    ).drop(
-        columns='passenger_origin'
-    ).groupby(['date', 'control_point']).agg('sum').reset_index()
-
-    diff_df['difference'] = diff_df['Arrival'] - diff_df['Departure']
-
-    # Filter for specific control points or merge all control points
-    if control_point is None or len(control_point) == 0:
-        diff_df = diff_df.groupby('date').agg('sum').reset_index()
-    else:
-        diff_df = diff_df[
-            diff_df['control_point'].isin(control_point)
-            ].groupby('date').agg('sum').reset_index()
-
-    # Plot with filtered range and return
-    filtered_df = diff_df[diff_df['date'].between(start_date, end_date)]
-
-    # Define colorblind-friendly colors
-    # Derived from "Coloring for Colorblindness" by David Nichols
-    # https://davidmathlogic.com/colorblind/
-    positive_color = '#00008B'
-    negative_color = '#DC3220'
-
-    # Color list
-    colors = [positive_color if diff > 0 else negative_color for diff in filtered_df['difference']]
+    filtered_df, colors, granularity = net_inflow(cube, start_date, end_date, control_point)
 
     # Create plotly chart object
-    fig = px.bar(
-        filtered_df,
-        x='date',
-        y='difference',
-        title='Net Passenger Inflow Over Time',
-        labels={'date': 'Date', 'difference': 'Net passenger inflow (count)'},
-        hover_data=['date', 'Arrival', 'Departure', 'difference'],
-        template=None
-    )
-
-    # Update the bar colors
-    fig.update_traces(marker_color=colors,
-                      marker_line_width=0)
+    fig = plotly.graph_objects.Figure(net_inflow_bars(filtered_df, colors))
 
     # Update the background to be white
     fig.update_layout(
+        title=chart_title('Net Passenger Inflow Over Time', granularity),
+        barmode='relative',
+        xaxis_title=LABELS['date'],
+        yaxis_title=LABELS['difference'],
         plot_bgcolor='white',
         paper_bgcolor='white',
         showlegend=False
@@ -96,3 +119,35 @@ def passenger_count(df, start_date, end_date, control_point: list[str] = None) -
     fig.update_xaxes(gridcolor='lightgrey')
 
     return fig
+
+
+@stage('figure')
+def passenger_count_patch(cube, start_date, end_date, control_point: list[str] = None) -> Patch:
+    """
+    Partial update of a figure built by `passenger_count`, replacing only the bars.
+
+    Besides the title, which shows the granularity, the layout and template stay as
+    they are in the browser, so only the data of the selected range is built and sent.
+
+    Parameters
+    ----------
+    cube : DataCube
+        The shared aggregated passenger counts from `data_store.get_cube()`
+    start_date : Date
+        Start date of the data to look at
+    end_date : Date
+        End date of the data to look at
+    control_point : list[str], optional
+        Control point to filter for. Defaults to None for all control points
+
+    Returns
+    -------
+    dash.Patch
+        Update of the figure's bar trace and title
+    """
+    filtered_df, colors, granularity = net_inflow(cube, start_date, end_date, control_point)
+
+    patched = Patch()
+    patched['layout']['title']['text'] = chart_title('Net Passenger Inflow Over Time', granularity)
+    patched['data'] = net_inflow_bars(filtered_df, colors)
+    return patched
@@ -1,7 +1,12 @@
-import pandas as pd
-import plotly.express as px # type: ignore
+import plotly.graph_objects as go # type: ignore
+from dash import Patch  # type: ignore
+from src.bar_trace import bar_trace
+from src.metrics import stage
 
-def passenger_origin(start_date, end_date, control_point, arrival_departure):
+LABELS = {'passenger_origin': 'Passenger Origin', 'passenger_count': 'Total Passengers'}
+
+@stage("figure")
+def passenger_origin(summary):
     """
     Generates a horizontal bar chart visualizing the total number of passengers 
     categorized by their country of origin over a specified date range, 
@@ -9,71 +14,60 @@ def passenger_origin(start_date, end_date, control_point, arrival_departure):
 
     Parameters:
     ----------
-    start_date : str or pd.Timestamp
-        The start date for filtering the dataset (format: YYYY-MM-DD).
-    end_date : str or pd.Timestamp
-        The end date for filtering the dataset (format: YYYY-MM-DD).
-    control_point : list of str, optional
-        A list of selected control points to filter passenger data. 
-        If None or ["all"], no filtering is applied.
-    arrival_departure : list of str, optional
-        A list specifying whether to include 'Arrival', 'Departure', or both. 
-        If None or ["all"], no filtering is applied.
+    summary : Summary
+        Aggregates of the selected date range, control points and arrival/departure types.
 
     Returns:
     -------
     plotly.graph_objects.Figure
         A Plotly horizontal bar chart displaying passenger counts by country of origin.
     """
-    # Load data
-    df = pd.read_csv('data/processed/data.csv').drop(columns='Unnamed: 0')
-    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
-
-    # Filter by control points (if specified)
-    if control_point:  # Ensure it's not empty
-        df = df[df['control_point'].isin(control_point)]
-
-    # Filter by travel type (arrival/departure) if specified
-    if arrival_departure:
-        df = df[df['travel_type'].isin(arrival_departure)]
-    
-    start_date = pd.to_datetime(start_date)
-    end_date = pd.to_datetime(end_date)
-    # Filter by date range
-    df = df[df['date'].between(start_date, end_date)]
-
-    # Aggregate data by travel passenger_origin
-    grouped_df = df.groupby('passenger_origin', as_index=False)['passenger_count'].sum()
+    # Passengers by origin, skipping origins without data in the range
+    grouped_df = summary.by_passenger_origin()
 
     # Define the custom order for passenger origin
     category_order = ["Hong Kong Residents", "Mainland Visitors", "Other Visitors"]
 
-    # Create a Plotly Express bar chart
-    fig = px.bar(
-        grouped_df,
-        x='passenger_count',
-        y='passenger_origin',
-        orientation='h',
-        title="Passenger Count by Passenger Origin",
-        labels={'passenger_origin': 'Passenger Origin', 'passenger_count': 'Total Passengers'},
-        barmode='group',
-        category_orders={"passenger_origin": category_order}  # Enforces the desired order
-    )
+    # Create the horizontal bar chart
+    fig = go.Figure(bar_trace(grouped_df, 'passenger_count', 'passenger_origin', LABELS, marker={'color': '#191970'}))
 
     # Add labels on top of bars
     #fig.update_traces(text=grouped_df['passenger_count'], textposition='outside')
     
-    # Set bar color
-    fig.update_traces(marker_color='#191970')
     # Customize layout
     fig.update_layout(
+        title="Passenger Count by Passenger Origin",
+        barmode='group',
         xaxis_title="Total Passengers",
         yaxis_title="Passenger Origin",
         showlegend=False,
         plot_bgcolor='white',  # Remove background color
         paper_bgcolor='white',  # Remove outer background color
         xaxis=dict(showgrid=False),  # Remove x-axis grid
-        yaxis=dict(showgrid=False)   # Remove y-axis grid
+        # Remove y-axis grid and enforce the desired order, listed from the bottom bar up
+        yaxis=dict(showgrid=False, categoryorder='array', categoryarray=category_order[::-1])
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+@stage("figure")
+def passenger_origin_patch(summary):
+    """
+    Partial update of a figure built by `passenger_origin`, replacing only the bars.
+
+    Parameters:
+    ----------
+    summary : Summary
+        Aggregates of the selected date range, control points and arrival/departure types.
+
+    Returns:
+    -------
+    dash.Patch
+        Update of the figure's bar trace.
+    """
+    grouped_df = summary.by_passenger_origin()
+
+    patched = Patch()
+    patched['data'] = bar_trace(grouped_df, 'passenger_count', 'passenger_origin', LABELS, marker={'color': '#191970'})
+    return patched
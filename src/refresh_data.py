@@ -0,0 +1,146 @@
+import argparse
+import os
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from src.load_data import DATA_SOURCE_LINK
+from src.clean_data import (
+    CHUNKSIZE, CUBE_PATH, MANIFEST_PATH, PROCESSED_PATH, RAW_PATH,
+    ProcessedWriter, build_cube, clean_chunk, clean_data, read_manifest, write_manifest,
+)
+from src.data_cube import DataCube
+
+
+def refresh_cube(new_rows, manifest, cube_path=CUBE_PATH, processed_path=PROCESSED_PATH,
+                 manifest_path=MANIFEST_PATH):
+    """
+    Extends the saved cube with newly appended rows, rebuilding it only when it cannot be extended.
+
+    Parameters:
+        new_rows (pd.DataFrame): Processed rows just appended, with dates as dd-mm-YYYY strings.
+        manifest (dict or None): Ingestion manifest as it was before the new rows were appended,
+            or None when it was out of step with the processed file and the cube must be rebuilt.
+        cube_path (str): Directory of the saved cube.
+        processed_path (str): Processed Feather file, already including the new rows.
+        manifest_path (str): Updated ingestion manifest to record as the cube's source.
+    """
+    cube = None
+    if manifest is not None and DataCube.load_source(cube_path) == manifest:
+        rows = new_rows.assign(date=pd.to_datetime(new_rows["date"], format="%d-%m-%Y"))
+        try:
+            cube = DataCube.load(cube_path).extend(rows)
+        except ValueError:
+            # New control points, travel types or origins, or a damaged cube
+            pass
+    if cube is None:
+        cube = build_cube(processed_path)
+    cube.save(cube_path, source=read_manifest(manifest_path))
+
+
+def last_raw_row(raw_path=RAW_PATH):
+    """
+    Reads the index and date of the last row of the raw CSV from the end of the file.
+
+    Parameters:
+        raw_path (str): Raw CSV written by load_data.py, with a leading index column.
+
+    Returns:
+        tuple: The running index (int) and date (pd.Timestamp) of the last raw row.
+    """
+    with open(raw_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        line = f.read().splitlines()[-1].decode()
+    index, date = line.split(",")[:2]
+    return int(index), pd.to_datetime(date, format="%d-%m-%Y")
+
+
+def refresh_data(source=DATA_SOURCE_LINK, raw_path=RAW_PATH, processed_path=PROCESSED_PATH,
+                 manifest_path=MANIFEST_PATH, chunksize=CHUNKSIZE, cube_path=CUBE_PATH):
+    """
+    Appends rows newer than the last ingested date to the raw and processed datasets.
+
+    The source is streamed in chunks and only rows dated after the last day already
+    stored are cleaned and appended, so the cost of a refresh follows the size of the
+    new data rather than the length of the history. The existing processed record
+    batches are copied as-is from the memory-mapped file into its replacement, without
+    being parsed or re-encoded, and the saved daily cube is extended by the new days.
+    Without a manifest the processed dataset is rebuilt once from the raw CSV first.
+
+    Swapping in the processed file is the commit point: the last ingested date is read
+    from the processed file itself, the raw CSV is appended after its own last row, and
+    the manifest and cube are brought in step afterwards. A refresh interrupted at any
+    step is completed by the next one and never ingests a day twice.
+
+    Parameters:
+        source (str): URL or path of a CSV in the layout published by the Immigration
+            Department (a leading index column, as written by load_data.py, is also accepted).
+        raw_path (str): Raw CSV to append the new source rows to.
+        processed_path (str): Processed Feather file to append the new cleaned rows to.
+        manifest_path (str): Ingestion manifest to read and update.
+        chunksize (int): Number of source rows read per chunk.
+        cube_path (str or None): Directory of the saved daily cube to keep in step, or None to skip it.
+
+    Returns:
+        pd.DataFrame: The newly appended processed rows, empty when the data is already up to date.
+    """
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        clean_data(raw_path, processed_path, chunksize, manifest_path, cube_path)
+        manifest = read_manifest(manifest_path)
+
+    table = feather.read_table(processed_path, memory_map=True)
+    last_date = pd.Timestamp(pc.max(table["date"]).as_py())
+    raw_index, raw_last_date = last_raw_row(raw_path)
+    # The cube can only be extended if it and the manifest matched the processed file before this run
+    in_step = (manifest["last_date"] == last_date.strftime("%Y-%m-%d")
+               and manifest["processed_rows"] == table.num_rows)
+
+    new_raw_rows = []
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        if chunk.columns[0].startswith("Unnamed"):
+            chunk = chunk.drop(columns=chunk.columns[0])
+
+        dates = pd.to_datetime(chunk["Date"], format="%d-%m-%Y")
+        chunk = chunk[dates > min(last_date, raw_last_date)]
+        if not chunk.empty:
+            new_raw_rows.append(chunk)
+
+    # An empty frame with the processed columns when the data is already up to date
+    new_rows = clean_chunk(pd.DataFrame(columns=["Date", "Control Point", "Arrival / Departure"]))
+    if new_raw_rows:
+        raw = pd.concat(new_raw_rows)
+        dates = pd.to_datetime(raw["Date"], format="%d-%m-%Y")
+        new_rows = clean_chunk(raw[dates > last_date].iloc[:, :6])
+
+        if not new_rows.empty:
+            # Write the extended processed file next to the current one, then swap it in
+            tmp_path = processed_path + ".tmp"
+            with ProcessedWriter(tmp_path) as writer:
+                writer.write_table(table)
+                writer.write(new_rows)
+            os.replace(tmp_path, processed_path)
+            last_date = dates.max()
+
+        # Raw rows keep the running index written by load_data.py
+        raw = raw[dates > raw_last_date]
+        if not raw.empty:
+            raw.index = pd.RangeIndex(raw_index + 1, raw_index + 1 + len(raw))
+            raw.to_csv(raw_path, mode="a", header=False)
+            raw_index += len(raw)
+
+    current = {"last_date": last_date.strftime("%Y-%m-%d"), "raw_rows": raw_index + 1,
+               "processed_rows": table.num_rows + len(new_rows)}
+    if current != manifest:
+        write_manifest(last_date, current["raw_rows"], current["processed_rows"], manifest_path)
+    if cube_path is not None and DataCube.load_source(cube_path) != read_manifest(manifest_path):
+        refresh_cube(new_rows, manifest if in_step else None, cube_path, processed_path, manifest_path)
+    return new_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append new daily passenger traffic to the local datasets.")
+    parser.add_argument("--source", default=DATA_SOURCE_LINK, help="URL or path of the published CSV")
+    args = parser.parse_args()
+    new_rows = refresh_data(args.source)
+    print(f"Appended {len(new_rows):,} processed rows")
@@ -0,0 +1,95 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+
+# REFRESH_INTERVAL is the number of seconds between data refreshes in the running app,
+# 0 (default) disables them. Open pages check for new data just as often.
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", 0))
+
+# URL or path of the CSV to ingest from, the Immigration Department's by default. Set it
+# empty to only pick up data ingested by another process, e.g. refresh_data.py run by cron.
+REFRESH_SOURCE = os.environ.get("REFRESH_SOURCE")
+
+# Held while a process ingests, so one worker downloads the new data and the others reuse it
+LOCK_PATH = "data/processed/refresh.lock"
+
+logger = logging.getLogger(__name__)
+
+
+def ingest(source, interval):
+    """
+    Appends new rows from `source` to the datasets, unless another process does or just did.
+
+    The lock file records the time of the last attempt, so with several workers the source
+    is downloaded about once per interval rather than once per worker.
+
+    Parameters:
+        source (str): URL or path of the published CSV.
+        interval (float): Seconds between refreshes.
+    """
+    from src.refresh_data import refresh_data
+
+    with open(LOCK_PATH, "a+") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        lock.seek(0)
+        if time.time() - float(lock.read() or 0) < interval / 2:
+            return
+        lock.truncate(0)
+        lock.write(str(time.time()))
+        lock.flush()
+        refresh_data(source)
+
+
+def refresh(source=REFRESH_SOURCE, interval=REFRESH_INTERVAL):
+    """
+    Ingests new data, swaps the saved cube in and warms the cache for it.
+
+    Everything runs in the calling thread, off the request path; callbacks keep serving
+    the previous data until the swap, and the cache is warmed right after it so the
+    first visitors on the new data do not all miss.
+
+    Parameters:
+        source (str, optional): URL or path of the CSV to ingest from, the official one when None
+            and nothing is ingested when empty.
+        interval (float): Seconds between refreshes, see `ingest`.
+
+    Returns:
+        bool: Whether new data was swapped in.
+    """
+    from src.callbacks import warm_cache
+    from src.data_store import reload_cube
+    from src.load_data import DATA_SOURCE_LINK
+
+    source = DATA_SOURCE_LINK if source is None else source
+    if source:
+        ingest(source, interval)
+    if not reload_cube():
+        return False
+    warm_cache()
+    return True
+
+
+def refresh_loop(interval, source):
+    while True:
+        time.sleep(interval)
+        try:
+            refresh(source, interval)
+        except Exception:
+            # A failed download or a malformed file is retried at the next interval
+            logger.exception("Data refresh failed")
+
+
+def start_refresh(interval=REFRESH_INTERVAL, source=REFRESH_SOURCE):
+    """
+    Refreshes the data every `interval` seconds in a background thread, if `interval` is set.
+
+    Call it in every process serving the app, after any fork: each one swaps in the new
+    data on its own, while the file lock lets only one of them ingest it.
+    """
+    if interval > 0:
+        threading.Thread(target=refresh_loop, args=(interval, source), name="data-refresh", daemon=True).start()
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pandas as pd
+from src.metrics import stage
+
+# Most points a time-series chart draws; longer ranges are summed into 7-day or 30-day buckets
+MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", 500))
+
+# Bucket lengths tried in turn when a series has too many days, as (days, granularity)
+GRANULARITIES = [(7, "7-day"), (30, "30-day")]
+
+
+@stage("aggregate")
+def downsample(series, max_points=MAX_POINTS):
+    """
+    Sums a daily series into 7-day or 30-day buckets when it has more than `max_points` days.
+
+    Buckets are counted from the first day of the series and labelled with their first day,
+    so every label falls inside the range. A last bucket cut short by the end of the range
+    is left out rather than drawn as a false dip, as are buckets without any day of data.
+
+    Parameters:
+        series (pd.DataFrame): Daily values indexed by date, e.g. from `Summary.daily_series`.
+        max_points (int): Most rows to return, unless even 30-day buckets exceed it.
+
+    Returns:
+        tuple: The series at the chosen granularity and the granularity, "daily", "7-day" or "30-day".
+    """
+    if len(series) <= max_points:
+        return series, "daily"
+    for days, granularity in GRANULARITIES:
+        buckets = series.resample(f"{days}D", origin="start").sum(min_count=1)
+        if (series.index[-1] - buckets.index[-1]).days + 1 < days:
+            buckets = buckets.iloc[:-1]
+        buckets = buckets.dropna(how="all")
+        if len(buckets) <= max_points:
+            break
+    return buckets.astype(series.dtypes), granularity
+
+
+def chart_title(title, granularity):
+    """
+    Adds the granularity of a downsampled time-series chart to its title, e.g. "Passenger Flow (7-day totals)".
+    """
+    return title if granularity == "daily" else f"{title} ({granularity} totals)"
+
+
+class Summary:
+    """
+    Every aggregate the dashboard shows for one filter state, computed in a single pass over the cube.
+
+    The filters are applied once: the range totals of the selected control points and
+    travel types come from one prefix-sum lookup and the daily series from one slice of
+    the date axis. The totals, map, bar charts and flow chart are all reductions of those
+    two small arrays, so a UI interaction no longer filters the data once per output.
+
+    Parameters:
+        cube (DataCube): Aggregated passenger counts from `data_store.get_cube()`.
+        start_date (str or pd.Timestamp, optional): First day of the range, the first day in the data if missing.
+        end_date (str or pd.Timestamp, optional): Last day of the range, the last day in the data if missing.
+        control_points (list of str, optional): Selected control points, all when empty.
+        travel_types (list of str, optional): Selected travel types (arrival/departure), all when empty.
+    """
+
+    @stage("filter")
+    def __init__(self, cube, start_date=None, end_date=None, control_points=None, travel_types=None):
+        dates = cube.date_slice(start_date, end_date)
+        control_point_index = cube.member_index("control_point", control_points)
+        travel_type_index = cube.member_index("travel_type", travel_types)
+
+        self.dates = cube.dates[dates]
+        self.control_points = cube.members["control_point"][control_point_index]
+        self.travel_methods = cube.travel_methods[control_point_index]
+        self.travel_types = cube.members["travel_type"][travel_type_index]
+        self.passenger_origins = cube.members["passenger_origin"]
+
+        def select(values):
+            # Selected members of the control_point and travel_type axes, which follow the date axis
+            return values.take(control_point_index, axis=1).take(travel_type_index, axis=2)
+
+        # (control_point, travel_type, passenger_origin) totals over the range
+        self.counts = select(cube.range_totals(start_date, end_date)[np.newaxis])[0]
+        self.rows = select(cube.range_totals(start_date, end_date, "rows")[np.newaxis])[0]
+        # (date, travel_type) daily series
+        self.daily_counts = select(cube.counts[dates]).sum(axis=(1, 3), dtype=np.int64)
+        self.daily_rows = select(cube.rows[dates]).sum(axis=(1, 3), dtype=np.int64)
+
+    @stage("aggregate")
+    def by_control_point(self):
+        """
+        Returns:
+            pd.DataFrame: control_point, travel_method and passenger_count of the control points with data.
+        """
+        return pd.DataFrame({
+            "control_point": self.control_points,
+            "travel_method": self.travel_methods,
+            "passenger_count": self.counts.sum(axis=(1, 2)),
+        })[self.rows.sum(axis=(1, 2)) > 0]
+
+    @stage("aggregate")
+    def by_travel_method(self):
+        """
+        Returns:
+            pd.DataFrame: travel_method and passenger_count, summed over the control points with data.
+        """
+        grouped_df = self.by_control_point()
+        return grouped_df.groupby("travel_method", as_index=False)["passenger_count"].sum()
+
+    @stage("aggregate")
+    def by_passenger_origin(self):
+        """
+        Returns:
+            pd.DataFrame: passenger_origin and passenger_count of the origins with data.
+        """
+        return pd.DataFrame({
+            "passenger_origin": self.passenger_origins,
+            "passenger_count": self.counts.sum(axis=(0, 1)),
+        })[self.rows.sum(axis=(0, 1)) > 0]
+
+    @stage("aggregate")
+    def daily_series(self):
+        """
+        Returns:
+            pd.DataFrame: One row per day with data in the range and one column per selected travel type,
+                as returned by `DataCube.daily_series`.
+        """
+        series = pd.DataFrame(
+            self.daily_counts,
+            index=self.dates.rename("date"),
+            columns=self.travel_types.rename("travel_type"),
+        )
+        return series[self.daily_rows.sum(axis=1) > 0]
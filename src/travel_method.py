@@ -1,7 +1,12 @@
-import pandas as pd
-import plotly.express as px # type: ignore
+import plotly.graph_objects as go # type: ignore
+from dash import Patch  # type: ignore
+from src.bar_trace import bar_trace
+from src.metrics import stage
 
-def travel_method(start_date, end_date, control_point=None, arrival_departure=None):
+LABELS = {'travel_method': 'Travel Method', 'passenger_count': 'Total Passengers'}
+
+@stage("figure")
+def travel_method(summary):
     """
     Generates a bar chart visualizing the total number of passengers by travel method 
     (by sea, by air, by land) over a specified date range, filtered by control points 
@@ -9,71 +14,60 @@ def travel_method(start_date, end_date, control_point=None, arrival_departure=No
 
     Parameters:
     ----------
-    start_date : str or pd.Timestamp
-        The start date for filtering the dataset (format: YYYY-MM-DD).
-    end_date : str or pd.Timestamp
-        The end date for filtering the dataset (format: YYYY-MM-DD).
-    control_point : list of str, optional
-        A list of selected control points to filter passenger data. 
-        If None or ["all"], no filtering is applied.
-    arrival_departure : list of str, optional
-        A list specifying whether to include 'Arrival', 'Departure', or both. 
-        If None or ["all"], no filtering is applied.
+    summary : Summary
+        Aggregates of the selected date range, control points and arrival/departure types.
 
     Returns:
     -------
     plotly.graph_objects.Figure
         A Plotly bar chart displaying the passenger count categorized by travel method.
     """
-    # Load data
-    df = pd.read_csv('data/processed/data.csv').drop(columns='Unnamed: 0')
-    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
-
-    # Filter by control points (if specified)
-    if control_point:  # Ensure it's not empty or "all"
-        df = df[df['control_point'].isin(control_point)]
-
-    # Filter by travel type (arrival/departure) if specified
-    if arrival_departure:
-        df = df[df['travel_type'].isin(arrival_departure)]
-
-    # Filter by date range
-    start_date = pd.to_datetime(start_date)
-    end_date = pd.to_datetime(end_date)
-    df = df[df['date'].between(start_date, end_date)]
-
-    # Aggregate data by travel method
-    grouped_df = df.groupby('travel_method', as_index=False)['passenger_count'].sum()
+    # Passengers by travel method, skipping control points without data in the range
+    grouped_df = summary.by_travel_method()
 
     # Define the custom order for travel methods
     category_order = ["by land", "by air", "by sea"]
 
-    # Create a Plotly Express bar chart
-    fig = px.bar(
-        grouped_df,
-        x='passenger_count',
-        y='travel_method',
-        title="Passenger Count by Travel Method",
-        labels={'travel_method': 'Travel Method', 'passenger_count': 'Total Passengers'},
-        barmode='group',
-        category_orders={"travel_method": category_order}  # Enforces the desired order
-    )
+    # Create the bar chart
+    fig = go.Figure(bar_trace(grouped_df, 'passenger_count', 'travel_method', LABELS, marker={'color': '#191970'}))
 
     # Add labels on top of bars
     #fig.update_traces(text=grouped_df['passenger_count'], textposition='outside')
 
-    # Set bar color
-    fig.update_traces(marker_color='#191970')
-
     # Customize layout
     fig.update_layout(
+        title="Passenger Count by Travel Method",
+        barmode='group',
         xaxis_title="Total Passengers",
         yaxis_title="Travel Method",
         plot_bgcolor='white',  # Remove background color
         paper_bgcolor='white',  # Remove outer background color
         xaxis=dict(showgrid=False),  # Remove x-axis grid
-        yaxis=dict(showgrid=False),   # Remove y-axis grid
+        # Remove y-axis grid and enforce the desired order, listed from the bottom bar up
+        yaxis=dict(showgrid=False, categoryorder='array', categoryarray=category_order[::-1]),
         showlegend=False
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+@stage("figure")
+def travel_method_patch(summary):
+    """
+    Partial update of a figure built by `travel_method`, replacing only the bars.
+
+    Parameters:
+    ----------
+    summary : Summary
+        Aggregates of the selected date range, control points and arrival/departure types.
+
+    Returns:
+    -------
+    dash.Patch
+        Update of the figure's bar trace.
+    """
+    grouped_df = summary.by_travel_method()
+
+    patched = Patch()
+    patched['data'] = bar_trace(grouped_df, 'passenger_count', 'travel_method', LABELS, marker={'color': '#191970'})
+    return patched